@@ -0,0 +1,124 @@
+####################################################################################################################
+# Benchmarks for the Triangle Relationship Finder
+#
+# Generates power-law networks of a few sizes with generate_network.py, then reports the wall time and peak
+# allocated memory (tracemalloc) of loading each one and of every menu option. Caches are cleared before each
+# option so every number is a cold run. tracemalloc's own bookkeeping does not fit in memory next to a
+# network of more than TRACED_PEOPLE people, so those are loaded in a separate, freshly started process and
+# their peak is that process's peak resident memory. Only the load is measured at those sizes.
+#
+# usage: python benchmark.py [--load-only] [number of people ...]
+#        default sizes: 200 2000 20000, or 200 20000 2000000 with --load-only
+#
+####################################################################################################################
+
+import multiprocessing
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # not on Windows, where the child process falls back to tracemalloc
+    resource = None
+
+import triangle
+from generate_network import write_network
+
+DEFAULT_SIZES = [200, 20000, 2000000]  # sizes the loader is measured at with --load-only
+OPTION_SIZES = [200, 2000, 20000]  # sizes every menu option is measured at
+TRACED_PEOPLE = 200000  # largest network whose load is measured with tracemalloc in this process
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024  # bytes per unit of ru_maxrss
+
+
+def measure(function, *args):
+    '''
+    Runs function twice: once under tracemalloc for peak memory, then once for wall time, so the tracing does
+    not slow down the timed run. The traced result is dropped before the timed run, so the two results are
+    never held at once.
+    :param function: function to measure
+    :param args: arguments to call it with
+    :return: seconds taken (float), peak allocated bytes (int), what function returned
+    '''
+    triangle.clear_graph_cache()
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    triangle.clear_graph_cache()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    return seconds, peak, result
+
+
+def load(paths):
+    '''
+    Loads a generated network with triangle.load_network
+    :param paths: paths of the names, X id and FB friend files (tuple of str)
+    :return: list of names (lst), nested dictionary of each person and their friends (dict)
+    '''
+    return triangle.load_network(*(open(path, "r") for path in paths))
+
+
+def measure_load(paths):
+    '''
+    Times one load of a generated network in this process and reads the process's peak resident memory, which
+    is the load's own peak when nothing else big has been in the process
+    :param paths: paths of the names, X id and FB friend files (tuple of str)
+    :return: seconds taken (float), peak bytes (int)
+    '''
+    if resource is None:
+        seconds, peak, _ = measure(load, paths)
+        return seconds, peak
+    start = time.perf_counter()
+    load(paths)
+    seconds = time.perf_counter() - start
+    return seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+def benchmark_size(people, load_only=False):
+    '''
+    Generates a network and measures the loader and every menu option on it
+    :param people: number of people in the network (int)
+    :param load_only: only measure loading (bool)
+    :return: (stage, seconds, peak bytes) for each stage (lst of tuples)
+    '''
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        if people > TRACED_PEOPLE:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pool.submit(time.perf_counter).result()  # start the process before generating: peaks are inherited
+                paths = write_network(directory, people)
+                seconds, peak = pool.submit(measure_load, paths).result()
+            rows.append(("load (rss)", seconds, peak))
+            return rows
+        paths = write_network(directory, people)
+        seconds, peak, (names_lst, friends_dict) = measure(load, paths)
+        rows.append(("load", seconds, peak))
+    if load_only:
+        return rows
+
+    person_index = triangle.make_person_index(friends_dict)
+    seconds, peak, _ = measure(triangle.max_intersect, friends_dict)
+    rows.append(("max_intersect", seconds, peak))
+    for option in ("1", "2", "3 " + names_lst[0], "4", "5", "6", "7", "8", "9", "10"):
+        seconds, peak, _ = measure(triangle.answer_query, option, friends_dict, person_index)
+        rows.append(("option " + option.split()[0], seconds, peak))
+    return rows
+
+
+def main():
+    args = sys.argv[1:]
+    load_only = "--load-only" in args
+    sizes = [int(size) for size in args if size != "--load-only"] or (DEFAULT_SIZES if load_only else OPTION_SIZES)
+    print("{:>12s}  {:16s}{:>12s}{:>14s}".format("People", "Stage", "Time (s)", "Peak (MB)"))
+    for people in sizes:
+        for stage, seconds, peak in benchmark_size(people, load_only):
+            print("{:>12,d}  {:16s}{:>12.3f}{:>14.1f}".format(people, stage, seconds, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
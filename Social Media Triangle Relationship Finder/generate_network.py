@@ -0,0 +1,122 @@
+####################################################################################################################
+# Synthetic network generator for the Triangle Relationship Finder
+#
+# Writes a names file, an X (twitter) id file and a Facebook friend file in the same formats as Names.csv,
+# twt_Friends_id.txt and fb_Friends.txt. Friend counts follow a power law (a few people have very many friends,
+# most have a handful) and a chosen share of X friendships also exist on Facebook.
+#
+# usage: python generate_network.py PEOPLE DIRECTORY [AVERAGE_FRIENDS] [OVERLAP]
+#
+####################################################################################################################
+
+import os
+import random
+import sys
+from array import array
+from itertools import accumulate
+
+AVERAGE_FRIENDS = 10
+OVERLAP = 0.2
+EXPONENT = 2.5  # friend counts are distributed like k^-EXPONENT
+BATCH_SIZE = 1000000  # friendships drawn at a time, so large networks do not need huge lists of draws
+
+
+def power_law_friendships(people, average_friends, rng, exponent=EXPONENT):
+    '''
+    Draws random friendships where the chance of a person being picked follows a power law (Chung-Lu model)
+    :param people: number of people in the network (int)
+    :param average_friends: wanted average number of friends per person (float)
+    :param rng: random number generator (random.Random)
+    :param exponent: power law exponent of the friend counts, above 2 (float)
+    :return: friendships, each encoded as lower id * people + higher id so 2M-person networks fit in memory
+             (set of int)
+    '''
+    weights = [(i + 1) ** (-1 / (exponent - 1)) for i in range(people)]
+    rng.shuffle(weights)  # so the best connected people are spread through the file
+    cum_weights = list(accumulate(weights))
+    population = range(people)
+    wanted = int(people * average_friends / 2)
+    friendships = set()
+    while len(friendships) < wanted:
+        batch = min(wanted - len(friendships), BATCH_SIZE)
+        ends1 = rng.choices(population, cum_weights=cum_weights, k=batch)
+        ends2 = rng.choices(population, cum_weights=cum_weights, k=batch)
+        for p1, p2 in zip(ends1, ends2):
+            if p1 != p2:
+                friendships.add(p1 * people + p2 if p1 < p2 else p2 * people + p1)
+        if len(friendships) >= people * (people - 1) // 2:
+            break
+    return friendships
+
+
+def friend_lists(people, friendships):
+    '''
+    Turns friendships into one sorted friend list per person. Every friend id is first packed into a flat array,
+    person by person, so only one person's list exists as Python objects at a time.
+    :param people: number of people in the network (int)
+    :param friendships: friendships encoded by power_law_friendships (set of int)
+    :return: generator of the sorted friend ids of each person, in id order (lsts)
+    '''
+    counts = array('q', bytes(8 * (people + 1)))
+    for friendship in friendships:
+        p1, p2 = divmod(friendship, people)
+        counts[p1 + 1] += 1
+        counts[p2 + 1] += 1
+    offsets = array('q', accumulate(counts))
+    cursor = array('q', offsets)
+    friends = array('i', bytes(4 * offsets[-1]))
+    for friendship in friendships:
+        p1, p2 = divmod(friendship, people)
+        friends[cursor[p1]] = p2
+        cursor[p1] += 1
+        friends[cursor[p2]] = p1
+        cursor[p2] += 1
+    for person in range(people):
+        yield sorted(friends[offsets[person]:offsets[person + 1]])
+
+
+def write_network(directory, people, average_friends=AVERAGE_FRIENDS, overlap=OVERLAP, seed=231):
+    '''
+    Writes a random network as Names.csv, twt_Friends_id.txt and fb_Friends.txt in directory. Each line of the
+    friend files is one person's friends followed by commas; people with no friends get an empty line.
+    :param directory: folder to write the three files to (str)
+    :param people: number of people in the network (int)
+    :param average_friends: average number of friends per person on each platform (float)
+    :param overlap: share of X friendships that are also Facebook friendships, 0 to 1 (float)
+    :param seed: random seed so runs are repeatable (int)
+    :return: paths of the names, X id and FB friend files (tuple of str)
+    '''
+    rng = random.Random(seed)
+    names = ["Person {}".format(i) for i in range(people)]
+    x_friendships = power_law_friendships(people, average_friends, rng)
+    fb_friendships = {friendship for friendship in x_friendships if rng.random() < overlap}
+    fb_friendships |= power_law_friendships(people, average_friends * (1 - overlap), rng)
+
+    paths = tuple(os.path.join(directory, file_name)
+                  for file_name in ("Names.csv", "twt_Friends_id.txt", "fb_Friends.txt"))
+    with open(paths[0], "w") as fp:
+        for name in names:
+            fp.write(name + "\n")
+    with open(paths[1], "w") as fp:
+        for friend_ids in friend_lists(people, x_friendships):
+            fp.write("".join("{},".format(friend) for friend in friend_ids) + "\n")
+    with open(paths[2], "w") as fp:
+        for friend_ids in friend_lists(people, fb_friendships):
+            fp.write("".join("{},".format(names[friend]) for friend in friend_ids) + "\n")
+    return paths
+
+
+def main():
+    if len(sys.argv) not in (3, 4, 5):
+        print("usage: python generate_network.py PEOPLE DIRECTORY [AVERAGE_FRIENDS] [OVERLAP]")
+        sys.exit(2)
+    people = int(sys.argv[1])
+    average_friends = float(sys.argv[3]) if len(sys.argv) > 3 else AVERAGE_FRIENDS
+    overlap = float(sys.argv[4]) if len(sys.argv) > 4 else OVERLAP
+    os.makedirs(sys.argv[2], exist_ok=True)
+    for path in write_network(sys.argv[2], people, average_friends, overlap):
+        print("wrote", path)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,8 +8,21 @@
 ####################################################################################################################
 
 import sys
+import os
 import csv
+import json
 import math
+import mmap
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from heapq import nlargest
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
 from operator import itemgetter
 
 
@@ -31,10 +44,102 @@ choices = '''
      5: The number of  triangle friendships in X
      6: The number of  triangle friendships on Facebook
      7: The number of  triangle friendships in X and Facebook together 
+     8: People in the most triangle friendships, with their clustering coefficient
+     9: The largest k-core (everyone has at least k friends inside it) in each network
+    10: The largest k-truss (every friendship is in at least k-2 triangles inside it) in each network
        Enter any other key(s) to exit
 
   '''
 
+_graph_cache = {}  # what has been worked out for the network in _graph_cache['friends_dict'], see graph_cache
+
+SNAPSHOT_MAGIC = b"TRIGRAPH2\n"
+SNAPSHOT_ENV = "TRIANGLE_SNAPSHOT"  # environment variable naming the network snapshot to load from
+
+WORKERS_ENV = "TRIANGLE_WORKERS"  # environment variable holding the number of processes main counts with
+
+_worker_graph = {}  # forward offsets and neighbours mapped by each counting process
+
+PROFILE_ENV = "TRIANGLE_PROFILE"  # environment variable naming the file the session profile is written to
+
+_profile = None  # SessionProfile of this run, when profiling is switched on
+
+
+class SessionProfile:
+    def __init__(self):
+        '''
+        Collects the wall time, CPU time and peak traced memory of each named stage of a session
+        '''
+        self.stages = {}  # stage -> [calls, wall seconds, cpu seconds, peak bytes]
+
+    @contextmanager
+    def stage(self, name):
+        '''
+        Measures the code run inside a with block. tracemalloc's peak is reset at the start, so the peak is the
+        most memory allocated at once during this stage.
+        :param name: stage to record the measurements under (str)
+        '''
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            peak = tracemalloc.get_traced_memory()[1] - start_memory
+            record = self.stages.setdefault(name, [0, 0.0, 0.0, 0])
+            record[0] += 1
+            record[1] += wall
+            record[2] += cpu
+            record[3] = max(record[3], peak)
+
+    def __str__(self):
+        '''
+        :return: one line per stage with its calls, total wall and CPU time and largest peak memory (str)
+        '''
+        lines = ["{:40s}{:>7s}{:>12s}{:>12s}{:>12s}".format("Stage", "Calls", "Wall (s)", "CPU (s)", "Peak (MB)")]
+        for name, (calls, wall, cpu, peak) in self.stages.items():
+            lines.append("{:40s}{:>7d}{:>12.4f}{:>12.4f}{:>12.2f}".format(name, calls, wall, cpu, peak / 1e6))
+        return "\n".join(lines)
+
+
+def start_profiling():
+    '''
+    Switches on profiling for the rest of the session
+    :return: the session profile (SessionProfile)
+    '''
+    global _profile
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _profile = SessionProfile()
+    return _profile
+
+
+def profile_stage(name):
+    '''
+    Measures a with block as a stage when profiling is on, and does nothing otherwise
+    :param name: stage to record the measurements under (str)
+    :return: context manager
+    '''
+    if _profile is None:
+        return nullcontext()
+    return _profile.stage(name)
+
+
+def write_profile_report(filename):
+    '''
+    Writes the session profile to a file, or to standard error if filename is "-"
+    :param filename: file to write the report to (str)
+    :return: nothing
+    '''
+    if filename == "-":
+        print(_profile, file=sys.stderr)
+    else:
+        with open(filename, "w") as fp:
+            fp.write(str(_profile) + "\n")
+
 
 def open_file(input_file):
     '''
@@ -63,14 +168,12 @@ def make_dict(twt_friends_list, fb_friends_list, names_list, fp_name, fp_x, fp_f
     parent_dict = {}
     for i, name in enumerate(names_list):
         sub_dict = {}
-        for index, individual_list in enumerate(twt_friends_list):
-            if i == index:
-                sub_dict['X'] = individual_list
-                parent_dict[name] = sub_dict
-        for index2, indiv_list in enumerate(fb_friends_list):
-            if i == index2:
-                sub_dict['FB'] = indiv_list
-                parent_dict[name] = sub_dict
+        if i < len(twt_friends_list):
+            sub_dict['X'] = twt_friends_list[i]
+        if i < len(fb_friends_list):
+            sub_dict['FB'] = fb_friends_list[i]
+        if sub_dict:
+            parent_dict[name] = sub_dict
     close_file(fp_name)
     close_file(fp_x)
     close_file(fp_fb)
@@ -89,6 +192,17 @@ def read_names(fp_names):
     return name_lst
 
 
+def iter_x_or_fb(fp):
+    '''
+    Yields one person's friend list per line of an X or FB file, without the empty strings left by trailing
+    commas, so a file can be fed into a graph builder without holding all of it in memory
+    :param fp: file pointer of file to be read
+    :return: generator of friend lists (lst), or '' for an empty line
+    '''
+    for line in fp:
+        yield split_friend_line(line)
+
+
 def read_x_or_fb(fp):
     '''
     Creates list of lists of friends (one list of friends per line, each list is one person's friend list)
@@ -96,37 +210,65 @@ def read_x_or_fb(fp):
     :param fp: file pointer of file to be read
     :return: list of lists of friends (X and FB) from file (lst of lsts)
     '''
-    friend_lst = []
-    for friend in fp:
-        friend = friend.strip()
-        if friend != "":
-            friend_lst.append(friend.split(","))
-        if friend == "":
-            friend_lst.append('')
-    for item in friend_lst:  # removes empty str at end of each sublist
-        if len(item) > 0:
-            for person in item:
-                if person == "":
-                    item.remove(person)
-    return friend_lst
+    return list(iter_x_or_fb(fp))
 
 
 def id_num_to_name(friend_lst, name_lst):
     '''
-    Turns id numbers into names (for twt id number txt file)
+    Turns id numbers into names (for twt id number txt file). An id number is the row of the name in name_lst.
     :param friend_lst: list of lists of friends (lst of lsts)
     :param name_lst: list of names (lst)
     :return: list of lists of friends
     '''
     for id_num_list in friend_lst:
         for i, id_num in enumerate(id_num_list):
-            if id_num != '' and id_num.isnumeric():
-                for index, name in enumerate(name_lst):
-                    if int(id_num) == index:
-                        id_num_list[i] = name
+            if id_num != '' and id_num.isnumeric() and int(id_num) < len(name_lst):
+                id_num_list[i] = name_lst[int(id_num)]
     return friend_lst
 
 
+def split_friend_line(line):
+    '''
+    Splits one line of a friend file into a list of friends, dropping the empty strings left by trailing commas.
+    An empty line gives '' like read_x_or_fb does.
+    :param line: line from an X or FB friend file (str)
+    :return: friends on that line (lst), or '' if the line is empty
+    '''
+    line = line.strip()
+    if line == "":
+        return ''
+    return [friend for friend in line.split(",") if friend != ""]
+
+
+def load_network(fp_name, fp_x, fp_fb):
+    '''
+    Reads the names, X id and FB friend files in one pass each and builds the nested dictionary that
+    read_names, read_x_or_fb, id_num_to_name and make_dict build together, in time linear in people + friendships.
+    Closes each file.
+    :param fp_name: file pointer for name csv file
+    :param fp_x: file pointer for twt friend id txt file
+    :param fp_fb: file pointer for fb friend file
+    :return: list of names (lst), nested dictionary of each person and their friends on each platform (dict)
+    '''
+    with profile_stage("read_names"):
+        names_lst = read_names(fp_name)
+    people = len(names_lst)
+    friends_dict = {}
+    with profile_stage("read_x_or_fb + id_num_to_name (X)"):
+        for i, friend_lst in enumerate(islice(iter_x_or_fb(fp_x), people)):
+            for j, id_num in enumerate(friend_lst):
+                if id_num.isnumeric() and int(id_num) < people:
+                    friend_lst[j] = names_lst[int(id_num)]
+            friends_dict[names_lst[i]] = {'X': friend_lst}
+    with profile_stage("read_x_or_fb + make_dict (FB)"):
+        for i, friend_lst in enumerate(islice(iter_x_or_fb(fp_fb), people)):
+            friends_dict.setdefault(names_lst[i], {})['FB'] = friend_lst
+    close_file(fp_name)
+    close_file(fp_x)
+    close_file(fp_fb)
+    return names_lst, friends_dict
+
+
 def close_file(fp):
     '''
     Closes file
@@ -136,31 +278,77 @@ def close_file(fp):
     fp.close()
 
 
-def display_individual_info(name, friends_dict):
+def make_person_index(friends_dict):
+    '''
+    Sorts every person's friend lists once so they can be displayed without searching or re-sorting
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :return: each person and their sorted X and FB friend lists (dict of {'X': lst, 'FB': lst})
+    '''
+    return {person: {'X': sorted(friends_dict[person]['X']), 'FB': sorted(friends_dict[person]['FB'])}
+            for person in friends_dict}
+
+
+def make_name_trie(names):
+    '''
+    Builds a prefix tree of names for completing partly typed names. Each node maps a character to the next
+    node, and the key None holds the name that ends at that node.
+    :param names: names to index (iterable of str)
+    :return: root of the prefix tree (dict)
+    '''
+    root = {}
+    for name in names:
+        node = root
+        for char in name:
+            node = node.setdefault(char, {})
+        node[None] = name
+    return root
+
+
+def complete_name(name_trie, prefix, limit=5):
+    '''
+    Finds names starting with prefix, in alphabetical order
+    :param name_trie: prefix tree from make_name_trie (dict)
+    :param prefix: start of a name (str)
+    :param limit: most names to return (int)
+    :return: matching names (lst)
+    '''
+    node = name_trie
+    for char in prefix:
+        if char not in node:
+            return []
+        node = node[char]
+    matches = []
+    stack = [node]
+    while stack and len(matches) < limit:
+        node = stack.pop()
+        if None in node:
+            matches.append(node[None])
+        stack.extend(node[char] for char in sorted((c for c in node if c is not None), reverse=True))
+    return matches
+
+
+def display_individual_info(name, friends_dict, person_index=None):
     '''
     Displays a inputted person's friends list from both X and FB
     :param name: inputted name to display info about (str)
     :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param person_index: sorted friend lists from make_person_index, if already built (dict)
     :return: nothing
     '''
-    twt_friends_lst = []
-    fb_friends_lst = []
+    if person_index is not None:
+        person = person_index.get(name)
+    elif name in friends_dict:
+        person = {'X': sorted(friends_dict[name]['X']), 'FB': sorted(friends_dict[name]['FB'])}
+    else:
+        person = None
     print("-" * 14 + "\nFriends in X\n" + "*" * 14)
-    for n in friends_dict.keys():
-        if n == name:
-            for friends in friends_dict[n]['X']:
-                twt_friends_lst.append(friends)
-                twt_friends_lst.sort()
-            for friend in twt_friends_lst:
-                print(friend, end="\n")
+    if person is not None:
+        for friend in person['X']:
+            print(friend, end="\n")
     print("-" * 20 + "\nFriends in Facebook\n" + "*" * 20)
-    for n in friends_dict.keys():
-        if n == name:
-            for friends in friends_dict[n]['FB']:
-                fb_friends_lst.append(friends)
-                fb_friends_lst.sort()
-            for friend in fb_friends_lst:
-                print(friend, end="\n")
+    if person is not None:
+        for friend in person['FB']:
+            print(friend, end="\n")
 
 
 def max_intersect(friends_dict):
@@ -188,10 +376,9 @@ def no_shared_friends(intersect_list):
     :param intersect_list: list of intersections (lst of sets)
     :return: amount of people with no shared friends (int)
     '''
-    no_shared_total = 1
-    empty_set = set()
+    no_shared_total = 0
     for intersection in intersect_list:
-        if intersection == empty_set:
+        if not intersection:
             no_shared_total += 1
     no_shared_percent = round((no_shared_total / len(intersect_list)) * 100)
     return no_shared_percent
@@ -199,110 +386,1190 @@ def no_shared_friends(intersect_list):
 
 def more_in_x_than_fb(friends_dict):
     '''
-    Counts the length of each person's friends lists for each social media platform, compares them, and counts
-    the amount of people who have more friends in X than FB
+    Compares the length of each person's friends lists for each social media platform and counts the amount of
+    people who have more friends in X than FB
     :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
     :return: percentage of people with more friends in X than FB (int)
     '''
-    friends_in_x = 0
-    friends_in_fb = 0
-    more_in_x_val = 1
+    more_in_x_val = 0
     for person in friends_dict:
-        for x_friends_lst in friends_dict[person]['X']:
-            friends_in_x = len(x_friends_lst)
-        for fb_friends_lst in friends_dict[person]['FB']:
-            friends_in_fb = len(fb_friends_lst)
-        if friends_in_x > friends_in_fb:
+        if len(friends_dict[person]['X']) > len(friends_dict[person]['FB']):
             more_in_x_val += 1
     more_in_x_percent = math.ceil((more_in_x_val / len(friends_dict)) * 100)
     return more_in_x_percent
 
 
-def triangle_friendships(friends_dict):
+def network_statistics(friends_dict):
+    '''
+    Works out everything menu options 1, 2 and 4 report in one pass over the network: the largest X and FB
+    overlap, the percentage of people with no shared friends (among people with a friend line on both
+    platforms, like max_intersect), the percentage with more friends in X than FB, and how many people have each
+    number of friends on each platform. The result is cached with the network's adjacencies (see graph_cache).
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :return: statistics keyed by 'max intersect', 'no shared percent', 'more in x percent', 'x degrees' and
+             'fb degrees' (dict)
+    '''
+    cache = graph_cache(friends_dict)
+    if 'stats' in cache:
+        return cache['stats']
+
+    max_val = 0
+    compared = 0
+    no_shared_total = 0
+    more_in_x_val = 0
+    x_degrees = {}
+    fb_degrees = {}
+    for person in friends_dict:
+        x_friends = friends_dict[person]['X']
+        fb_friends = friends_dict[person]['FB']
+        x_degrees[len(x_friends)] = x_degrees.get(len(x_friends), 0) + 1
+        fb_degrees[len(fb_friends)] = fb_degrees.get(len(fb_friends), 0) + 1
+        if len(x_friends) > len(fb_friends):
+            more_in_x_val += 1
+        if '' not in x_friends and '' not in fb_friends:
+            compared += 1
+            shared = len(set(x_friends).intersection(fb_friends))
+            if shared == 0:
+                no_shared_total += 1
+            if shared > max_val:
+                max_val = shared
+
+    stats = {'max intersect': max_val,
+             'no shared percent': round(no_shared_total / compared * 100) if compared else 0,
+             'more in x percent': math.ceil(more_in_x_val / len(friends_dict) * 100) if friends_dict else 0,
+             'x degrees': x_degrees,
+             'fb degrees': fb_degrees}
+    cache['stats'] = stats
+    return stats
+
+
+def make_adjacency(friends_dict, social_media):
     '''
-    Loops through each person, each of their friends, and each of that friend's friends and compares them to determine
-    if they are a "triangle friendship" (if they are all friends with each other).
+    Builds a set of friends for each person on one platform, or on both merged together ('both'). Two people are
+    only linked if each is on the other's friend list, so one-sided entries in the friend files are ignored.
     :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: platform to build the adjacency for, 'X', 'FB' or 'both' (str)
+    :return: each person and the set of their mutual friends (dict of sets)
+    '''
+    if social_media == 'both':
+        listed = {person: set(friends_dict[person]['X']).union(friends_dict[person]['FB']) for person in friends_dict}
+    else:
+        listed = {person: set(friends_dict[person][social_media]) for person in friends_dict}
+    adjacency = {}
+    for person, friends in listed.items():
+        adjacency[person] = {friend for friend in friends
+                             if friend != person and friend in listed and person in listed[friend]}
+    return adjacency
+
+
+def graph_cache(friends_dict):
+    '''
+    Gives the cache of what has been worked out for friends_dict: each platform's adjacency, its triangle count
+    and the network statistics. Passing in a different dictionary, or the same one with people added or removed,
+    starts a new cache, so looking something up costs the same however big the network is. Friend lists edited
+    through add_friend and remove_friend drop the cache themselves; after editing friends_dict any other way,
+    call network_changed(friends_dict).
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :return: the cache, keyed by ('adjacency', social media), ('triangles', social media), 'overlaps' and
+             'stats' (dict)
+    '''
+    if _graph_cache.get('friends_dict') is not friends_dict or _graph_cache.get('people') != len(friends_dict):
+        _graph_cache.clear()
+        _graph_cache['friends_dict'] = friends_dict
+        _graph_cache['people'] = len(friends_dict)
+    return _graph_cache
+
+
+def get_adjacency(friends_dict, social_media):
+    '''
+    Returns the adjacency for a platform, building it only the first time it is asked for
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: 'X', 'FB' or 'both' (str)
+    :return: each person and the set of their mutual friends (dict of sets)
+    '''
+    cache = graph_cache(friends_dict)
+    key = ('adjacency', social_media)
+    if key not in cache:
+        cache[key] = make_adjacency(friends_dict, social_media)
+    return cache[key]
+
+
+def get_overlaps(friends_dict):
+    '''
+    Returns the network as a CompactGraph (people numbered in dictionary order) and every person's X and FB
+    overlap from overlap_sizes, building them only the first time they are asked for
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :return: the friend network (CompactGraph), shared friend count of each person by id (array of int32)
+    '''
+    cache = graph_cache(friends_dict)
+    if 'overlaps' not in cache:
+        graph = compact_graph_from_dict(friends_dict)
+        cache['overlaps'] = (graph, overlap_sizes(graph))
+    return cache['overlaps']
+
+
+def get_triangle_count(friends_dict, social_media, workers=1):
+    '''
+    Returns the number of triangle friendships on a platform, counting them only the first time it is asked for
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: 'X', 'FB' or 'both' (str)
+    :param workers: number of processes to count with (int)
+    :return: the amount of triangle friendships (int)
+    '''
+    cache = graph_cache(friends_dict)
+    key = ('triangles', social_media)
+    if key not in cache:
+        cache[key] = count_triangles_with(get_adjacency(friends_dict, social_media), workers)
+    return cache[key]
+
+
+def clear_graph_cache():
+    '''
+    Forgets every cached adjacency, triangle count and the cached network statistics
+    :return: nothing
+    '''
+    _graph_cache.clear()
+
+
+def network_changed(friends_dict):
+    '''
+    Forgets what has been worked out for friends_dict once it has been edited in place, so the next adjacency,
+    triangle count, overlap or statistics lookup sees the edit. Other networks' caches are left alone.
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :return: nothing
+    '''
+    if _graph_cache.get('friends_dict') is friends_dict:
+        _graph_cache.clear()
+
+
+def add_friend(friends_dict, person, friend, social_media):
+    '''
+    Lists friend among person's friends on a platform, adding person to the network if they are new, and drops
+    anything cached for the network. As in the friend files, a friendship only counts once both people list
+    each other.
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param person: name of the person whose friend list changes (str)
+    :param friend: name of the friend to list (str)
+    :param social_media: 'X' or 'FB' (str)
+    :return: nothing
+    '''
+    friends = friends_dict.setdefault(person, {'X': '', 'FB': ''})
+    if not friends.get(social_media):
+        friends[social_media] = []
+    if friend not in friends[social_media]:
+        friends[social_media].append(friend)
+    network_changed(friends_dict)
+
+
+def remove_friend(friends_dict, person, friend, social_media):
+    '''
+    Takes friend off person's friend list on a platform and drops anything cached for the network
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param person: name of the person whose friend list changes (str)
+    :param friend: name of the friend to take off (str)
+    :param social_media: 'X' or 'FB' (str)
+    :return: nothing
+    '''
+    friends = friends_dict[person][social_media]
+    if isinstance(friends, list) and friend in friends:
+        friends.remove(friend)
+    network_changed(friends_dict)
+
+
+def orient_by_degree(adjacency):
+    '''
+    Ranks people by (number of friends, name) and keeps each friendship only from the lower ranked person to the
+    higher ranked one, so every triangle is reachable from exactly one of its edges and nobody has more than
+    about sqrt(2 * edges) forward friends.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: each person and the set of their higher ranked friends (dict of sets)
+    '''
+    rank = {person: i for i, person in enumerate(sorted(adjacency, key=lambda p: (len(adjacency[p]), p)))}
+    forward = {}
+    for person, friends in adjacency.items():
+        person_rank = rank[person]
+        forward[person] = {friend for friend in friends if rank[friend] > person_rank}
+    return forward
+
+
+def count_triangles(adjacency):
+    '''
+    Counts each triangle friendship exactly once by intersecting the forward friend sets of both ends of every
+    forward friendship.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: the amount of triangle friendships (int)
+    '''
+    forward = orient_by_degree(adjacency)
+    total = 0
+    for p1, p1_forward in forward.items():
+        for p2 in p1_forward:
+            total += len(p1_forward & forward[p2])
+    return total
+
+
+def iter_triangles(adjacency):
+    '''
+    Yields every triangle friendship exactly once, using the same degree-ordered enumeration as count_triangles.
+    Within a triangle the people come lowest (number of friends, name) rank first.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: generator of (p1, p2, p3) name triples
+    '''
+    forward = orient_by_degree(adjacency)
+    for p1, p1_forward in forward.items():
+        for p2 in p1_forward:
+            for p3 in p1_forward & forward[p2]:
+                yield p1, p2, p3
+
+
+def triangle_friendship_list(friends_dict, social_media):
+    '''
+    Yields every triangle friendship on a platform
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: 'X', 'FB' or 'both' (str)
+    :return: generator of (p1, p2, p3) name triples
+    '''
+    return iter_triangles(get_adjacency(friends_dict, social_media))
+
+
+def write_triangles(triangles, filename, person_ids=None, chunk_size=10000):
+    '''
+    Streams triangles to a file chunk_size at a time, so they never all have to be in memory. Without
+    person_ids the file is CSV with one "p1,p2,p3" row of names per triangle; with person_ids it is binary,
+    three native int32 ids per triangle.
+    :param triangles: (p1, p2, p3) name triples, e.g. from iter_triangles (iterable of tuples)
+    :param filename: file to write (str)
+    :param person_ids: name -> integer id, to write the binary format (dict)
+    :param chunk_size: triangles written per chunk (int)
+    :return: the number of triangles written (int)
+    '''
+    triangles = iter(triangles)
+    written = 0
+    if person_ids is None:
+        with open(filename, "w", newline="") as fp:
+            writer = csv.writer(fp)
+            while True:
+                chunk = list(islice(triangles, chunk_size))
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                written += len(chunk)
+    else:
+        with open(filename, "wb") as fp:
+            while True:
+                chunk = array('i', (person_ids[person] for triangle in islice(triangles, chunk_size)
+                                    for person in triangle))
+                if not chunk:
+                    break
+                chunk.tofile(fp)
+                written += len(chunk) // 3
+    return written
+
+
+def make_forward_csr(adjacency):
+    '''
+    Numbers people by (number of friends, name) rank and packs each person's higher ranked friends into sorted
+    offset and neighbour arrays, the integer form of orient_by_degree
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: forward offsets (array of int64), forward neighbours (array of int32)
+    '''
+    ranked = sorted(adjacency, key=lambda p: (len(adjacency[p]), p))
+    rank = {person: i for i, person in enumerate(ranked)}
+    offsets = array('q', [0])
+    neighbours = array('i')
+    for i, person in enumerate(ranked):
+        neighbours.extend(sorted(rank[friend] for friend in adjacency[person] if rank[friend] > i))
+        offsets.append(len(neighbours))
+    return offsets, neighbours
+
+
+def _attach_forward_csr(path, people):
+    '''
+    Process pool initializer: maps the forward arrays written by parallel_count_triangles
+    :param path: temporary file holding the offsets followed by the neighbours (str)
+    :param people: number of people in the network (int)
+    :return: nothing
+    '''
+    with open(path, "rb") as fp:
+        view = memoryview(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+    offsets_size = (people + 1) * 8
+    _worker_graph['offsets'] = view[:offsets_size].cast('q')
+    _worker_graph['neighbours'] = view[offsets_size:].cast('i')
+
+
+def _count_partition(start, end):
+    '''
+    Counts the triangles whose lowest ranked person is in [start, end)
+    :param start: first person id of the partition (int)
+    :param end: one past the last person id of the partition (int)
+    :return: the amount of triangle friendships found (int)
+    '''
+    offsets = _worker_graph['offsets']
+    neighbours = _worker_graph['neighbours']
+    total = 0
+    for p1 in range(start, end):
+        p1_forward = set(neighbours[offsets[p1]:offsets[p1 + 1]])
+        for p2 in p1_forward:
+            total += len(p1_forward.intersection(neighbours[offsets[p2]:offsets[p2 + 1]]))
+    return total
+
+
+def partition_people(offsets, partitions):
+    '''
+    Splits person ids into consecutive ranges holding about the same number of forward friendships
+    :param offsets: forward offsets (array of int64)
+    :param partitions: number of ranges wanted (int)
+    :return: (start, end) of each range (lst of tuples)
+    '''
+    people = len(offsets) - 1
+    per_partition = offsets[people] / partitions
+    ranges = []
+    start = 0
+    for i in range(1, partitions + 1):
+        end = bisect_left(offsets, per_partition * i, start, people) if i < partitions else people
+        if end > start:
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parallel_count_triangles(adjacency, workers=None):
+    '''
+    Counts triangle friendships with several processes. The degree-oriented adjacency is written once to a
+    temporary file that every process maps read-only, people are split into ranges of similar work and each
+    process counts the triangles starting in its ranges; the partial counts are summed.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :param workers: number of processes, defaults to the number of CPUs (int)
+    :return: the amount of triangle friendships (int)
+    '''
+    workers = workers or os.cpu_count() or 1
+    offsets, neighbours = make_forward_csr(adjacency)
+    ranges = partition_people(offsets, workers * 4)
+    if not ranges:
+        return 0
+    fd, path = tempfile.mkstemp(suffix=".graph")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(offsets)
+            fp.write(neighbours)
+            fp.write(b"\0" * 4)  # mmap cannot map an empty file
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_forward_csr,
+                                 initargs=(path, len(adjacency))) as executor:
+            futures = [executor.submit(_count_partition, start, end) for start, end in ranges]
+            return sum(future.result() for future in futures)
+    finally:
+        os.remove(path)
+
+
+def count_triangles_with(adjacency, workers=1):
+    '''
+    Counts triangle friendships in this process, or across worker processes when workers is more than 1
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :param workers: number of processes to count with (int)
+    :return: the amount of triangle friendships (int)
+    '''
+    if workers > 1:
+        return parallel_count_triangles(adjacency, workers)
+    return count_triangles(adjacency)
+
+
+def triangle_friendships(friends_dict, workers=1):
+    '''
+    Counts the "triangle friendships" (three people who are all friends with each other) on each platform.
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param workers: number of processes to count with (int)
     :return: the amount of triangle friendships in X (int), and FB (int)
     '''
-    x_total = 0
-    fb_total = 0
-    for i in range(2):
-        if i == 0:
-            social_media = 'X'
-        if i == 1:
-            social_media = 'FB'
-        for p1 in friends_dict:  # loop through all people in network
-            for p2 in friends_dict[p1][social_media]:  # loop through all their friends
-                for p3 in friends_dict[p2][social_media]:
-                    if (p1 in friends_dict[p2][social_media] and p2 in friends_dict[p3][social_media] and
-                            p1 in friends_dict[p3][social_media]):
-                        if p1 != p3 and p2 != p3 and p1 != p2:
-                            if i == 0:
-                                x_total += 1
-                            if i == 1:
-                                fb_total += 1
-                        else:
-                            continue
-    x_total = int(x_total / 6)  # I cant figure out how to fix the total being 6x more than it should be :(
-    fb_total = int(fb_total / 6)
+    x_total = get_triangle_count(friends_dict, 'X', workers)
+    fb_total = get_triangle_count(friends_dict, 'FB', workers)
     return x_total, fb_total
 
 
-def both_triangle_friendships(friends_dict):
+def both_triangle_friendships(friends_dict, workers=1):
     '''
-    Loops through each person, the union of each of their friend lists, and the union of each of the friends in the
-    first person's union, and compares them to determine if they are a "triangle friendship"
-    (if they are all friends with each other).
+    Counts the "triangle friendships" in the network made by merging each person's X and FB friend lists.
     :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param workers: number of processes to count with (int)
     :return: the amount of triangle friendships in both X and FB (int)
     '''
-    total = 0
-    for p1 in friends_dict:  # loop through all people in network
-        for p2 in set(friends_dict[p1]['X']).union(friends_dict[p1]['FB']):  # loop through all their friends
-            for p3 in set(friends_dict[p2]['X']).union(friends_dict[p2]['FB']):
-                if (p1 in set(friends_dict[p2]['X']).union(friends_dict[p2]['FB']) and
-                        p2 in set(friends_dict[p3]['X']).union(friends_dict[p3]['FB']) and
-                        p1 in set(friends_dict[p3]['X']).union(friends_dict[p3]['FB'])):
-                    if p1 != p3 and p2 != p3 and p1 != p2:
-                        total += 1
-    total /= 6
-    return int(total)
+    return get_triangle_count(friends_dict, 'both', workers)
+
+
+def estimate_triangles(adjacency, samples=20000, z=1.96, seed=None):
+    '''
+    Estimates the number of triangle friendships by wedge sampling. A wedge is a person with two of their
+    friends; wedges are picked uniformly at random and the share that are closed (the two friends are also
+    friends) times the number of wedges / 3 is the triangle count. The error shrinks with the square root of the
+    number of samples, not with the size of the network. The bounds are a Wilson score interval on the closed
+    share, which stays valid when few or none of the sampled wedges are closed: with none closed the upper bound is
+    about z^2 / samples of the wedges / 3 rather than zero.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :param samples: number of wedges to check (int)
+    :param z: normal quantile for the confidence interval, 1.96 for 95% (float)
+    :param seed: random seed, for repeatable estimates
+    :return: estimated triangles (float), lower bound (float), upper bound (float)
+    '''
+    rng = random.Random(seed)
+    centers = []
+    cumulative_wedges = []
+    total_wedges = 0
+    for person, friends in adjacency.items():
+        if len(friends) > 1:
+            total_wedges += len(friends) * (len(friends) - 1) // 2
+            centers.append(person)
+            cumulative_wedges.append(total_wedges)
+    if total_wedges == 0 or samples <= 0:
+        return 0.0, 0.0, 0.0
+
+    friend_tuples = {}  # random.sample needs a sequence, only built for centers that get picked
+    closed = 0
+    for _ in range(samples):
+        center = centers[bisect_right(cumulative_wedges, rng.randrange(total_wedges))]
+        if center not in friend_tuples:
+            friend_tuples[center] = tuple(adjacency[center])
+        p1, p2 = rng.sample(friend_tuples[center], 2)
+        if p2 in adjacency[p1]:
+            closed += 1
+
+    closed_share = closed / samples
+    estimate = closed_share * total_wedges / 3
+    z_squared = z * z
+    centre = (closed_share + z_squared / (2 * samples)) / (1 + z_squared / samples)
+    margin = (z / (1 + z_squared / samples)
+              * math.sqrt(closed_share * (1 - closed_share) / samples + z_squared / (4 * samples * samples)))
+    lower_share = max(0.0, centre - margin)
+    upper_share = min(1.0, centre + margin)
+    return estimate, lower_share * total_wedges / 3, upper_share * total_wedges / 3
+
+
+def approximate_triangle_friendships(friends_dict, samples=20000, seed=None):
+    '''
+    Estimates the triangle friendships on X, on FB and on both merged together, for networks too large to count
+    exactly in time
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param samples: number of wedges to check per network (int)
+    :param seed: random seed, for repeatable estimates
+    :return: 'X', 'FB' and 'both' -> (estimate, lower bound, upper bound) (dict of tuples)
+    '''
+    estimates = {}
+    for social_media in ('X', 'FB', 'both'):
+        estimates[social_media] = estimate_triangles(get_adjacency(friends_dict, social_media), samples, seed=seed)
+    return estimates
+
+
+def person_triangle_counts(adjacency):
+    '''
+    Counts how many triangle friendships each person is part of, crediting all three people of every triangle
+    found by the degree-ordered enumeration, so it costs the same as one global count. The local clustering
+    coefficient is the share of pairs of a person's friends who are friends with each other.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: triangles per person (array of int64), clustering coefficient per person (array of float),
+             both indexed like list(adjacency)
+    '''
+    index = {person: i for i, person in enumerate(adjacency)}
+    forward = orient_by_degree(adjacency)
+    counts = array('q', bytes(8 * len(adjacency)))
+    for p1, p1_forward in forward.items():
+        for p2 in p1_forward:
+            shared = p1_forward & forward[p2]
+            if shared:
+                counts[index[p1]] += len(shared)
+                counts[index[p2]] += len(shared)
+                for p3 in shared:
+                    counts[index[p3]] += 1
+    clustering = array('d', bytes(8 * len(adjacency)))
+    for person, i in index.items():
+        degree = len(adjacency[person])
+        if degree > 1:
+            clustering[i] = 2 * counts[i] / (degree * (degree - 1))
+    return counts, clustering
+
+
+def most_triangle_friendships(friends_dict, social_media, top=5):
+    '''
+    Finds the people who are part of the most triangle friendships on a platform
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: 'X', 'FB' or 'both' (str)
+    :param top: number of people to return (int)
+    :return: (name, triangles, clustering coefficient) of each person, most triangles first (lst of tuples)
+    '''
+    adjacency = get_adjacency(friends_dict, social_media)
+    counts, clustering = person_triangle_counts(adjacency)
+    people = [(name, counts[i], clustering[i]) for i, name in enumerate(adjacency)]
+    people.sort(key=itemgetter(1), reverse=True)
+    return people[:top]
+
+
+def core_numbers(adjacency):
+    '''
+    Finds each person's core number: the largest k such that they belong to a group where everyone has at least
+    k friends inside the group. People are peeled off in order of their remaining number of friends using a
+    bucket queue, which takes time linear in people + friendships.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: each person and their core number (dict)
+    '''
+    degree = {person: len(friends) for person, friends in adjacency.items()}
+    buckets = [set() for _ in range(max(degree.values(), default=0) + 1)]
+    for person, person_degree in degree.items():
+        buckets[person_degree].add(person)
+    core = {}
+    k = 0
+    for _ in range(len(degree)):
+        k = max(k - 1, 0)  # removing a person lowers their friends' degrees by at most one
+        while not buckets[k]:
+            k += 1
+        person = buckets[k].pop()
+        core[person] = k
+        for friend in adjacency[person]:
+            if friend not in core and degree[friend] > k:
+                buckets[degree[friend]].remove(friend)
+                degree[friend] -= 1
+                buckets[degree[friend]].add(friend)
+    return core
+
+
+def truss_numbers(adjacency):
+    '''
+    Finds each friendship's truss number: the largest k such that it belongs to a group where every friendship
+    is part of at least k - 2 triangles inside the group. The triangles each friendship is part of (its support)
+    are counted with iter_triangles, then friendships are peeled off in order of remaining support with a
+    bucket queue, updating the support of the other two sides of every triangle that breaks.
+    :param adjacency: each person and the set of their friends (dict of sets)
+    :return: each friendship, as a (name, name) pair in alphabetical order, and its truss number (dict)
+    '''
+    support = {}
+    for person, friends in adjacency.items():
+        for friend in friends:
+            if person < friend:
+                support[(person, friend)] = 0
+    for p1, p2, p3 in iter_triangles(adjacency):
+        for edge in ((p1, p2), (p1, p3), (p2, p3)):
+            support[edge if edge[0] < edge[1] else (edge[1], edge[0])] += 1
+
+    buckets = [set() for _ in range(max(support.values(), default=0) + 1)]
+    for edge, edge_support in support.items():
+        buckets[edge_support].add(edge)
+    remaining = {person: set(friends) for person, friends in adjacency.items()}
+    truss = {}
+    k = 0
+    for _ in range(len(support)):
+        k = max(k - 1, 0)  # removing a friendship lowers other supports by at most one
+        while not buckets[k]:
+            k += 1
+        p1, p2 = edge = buckets[k].pop()
+        truss[edge] = k + 2
+        remaining[p1].discard(p2)
+        remaining[p2].discard(p1)
+        for p3 in remaining[p1] & remaining[p2]:
+            for side in ((p1, p3), (p2, p3)):
+                side = side if side[0] < side[1] else (side[1], side[0])
+                if support[side] > k:
+                    buckets[support[side]].remove(side)
+                    support[side] -= 1
+                    buckets[support[side]].add(side)
+    return truss
+
+
+def largest_k_core(friends_dict, social_media):
+    '''
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: 'X', 'FB' or 'both' (str)
+    :return: largest k with a non-empty k-core (int), number of people in that core (int)
+    '''
+    core = core_numbers(get_adjacency(friends_dict, social_media))
+    k = max(core.values(), default=0)
+    return k, sum(1 for person_core in core.values() if person_core == k)
+
+
+def largest_k_truss(friends_dict, social_media):
+    '''
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param social_media: 'X', 'FB' or 'both' (str)
+    :return: largest k with a non-empty k-truss (int), number of friendships in that truss (int)
+    '''
+    truss = truss_numbers(get_adjacency(friends_dict, social_media))
+    k = max(truss.values(), default=0)
+    return k, sum(1 for edge_truss in truss.values() if edge_truss == k)
+
+
+class TriangleCounter:
+    def __init__(self, friends_dict):
+        '''
+        Keeps the number of triangle friendships on X and FB, overall and per person, up to date as friendships
+        are added and removed, instead of recounting the whole network after every change. friends_dict itself is
+        only read when the counter is made.
+        :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+        '''
+        self.adjacency = {}
+        self.totals = {}
+        self.person_totals = {}
+        for social_media in ('X', 'FB'):
+            adjacency = make_adjacency(friends_dict, social_media)
+            counts, clustering = person_triangle_counts(adjacency)
+            self.adjacency[social_media] = adjacency
+            self.totals[social_media] = sum(counts) // 3
+            self.person_totals[social_media] = {person: counts[i] for i, person in enumerate(adjacency)}
+
+    def __str__(self):
+        '''
+        :return: the current totals on each platform (str)
+        '''
+        return "X: {} triangle friendships, FB: {} triangle friendships".format(self.totals['X'], self.totals['FB'])
+
+    def _update(self, p1, p2, social_media, change):
+        '''
+        Adds change (1 or -1) for every triangle closed by the friendship p1-p2. The shared friends are found by
+        intersecting the two friend sets, which only walks the smaller one.
+        :param p1: name of one person (str)
+        :param p2: name of the other person (str)
+        :param social_media: 'X' or 'FB' (str)
+        :param change: 1 when the friendship is added, -1 when it is removed (int)
+        :return: number of triangles the friendship is part of (int)
+        '''
+        adjacency = self.adjacency[social_media]
+        person_totals = self.person_totals[social_media]
+        shared = adjacency[p1] & adjacency[p2]
+        self.totals[social_media] += change * len(shared)
+        person_totals[p1] += change * len(shared)
+        person_totals[p2] += change * len(shared)
+        for p3 in shared:
+            person_totals[p3] += change
+        return len(shared)
+
+    def add_friendship(self, p1, p2, social_media):
+        '''
+        Records that p1 and p2 became friends, adding either person to the network if they are new
+        :param p1: name of one person (str)
+        :param p2: name of the other person (str)
+        :param social_media: 'X' or 'FB' (str)
+        :return: number of triangle friendships created (int)
+        '''
+        adjacency = self.adjacency[social_media]
+        for person in (p1, p2):
+            if person not in adjacency:
+                adjacency[person] = set()
+                self.person_totals[social_media][person] = 0
+        if p1 == p2 or p2 in adjacency[p1]:
+            return 0
+        created = self._update(p1, p2, social_media, 1)
+        adjacency[p1].add(p2)
+        adjacency[p2].add(p1)
+        return created
+
+    def remove_friendship(self, p1, p2, social_media):
+        '''
+        Records that p1 and p2 are no longer friends
+        :param p1: name of one person (str)
+        :param p2: name of the other person (str)
+        :param social_media: 'X' or 'FB' (str)
+        :return: number of triangle friendships broken (int)
+        '''
+        adjacency = self.adjacency[social_media]
+        if p1 not in adjacency or p2 not in adjacency[p1]:
+            return 0
+        adjacency[p1].discard(p2)
+        adjacency[p2].discard(p1)
+        return self._update(p1, p2, social_media, -1)
+
+
+class CompactGraph:
+    def __init__(self, names, offsets, neighbours):
+        '''
+        Friend network where each person is an integer id (their row in the names file). Each platform is stored
+        as two flat arrays: neighbours holds every person's sorted friend ids back to back and offsets[i] is where
+        person i's friends start, so a friendship costs 4 bytes instead of a list slot pointing at a name string.
+        :param names: name of each person, indexed by id (lst)
+        :param offsets: platform ('X' or 'FB') -> start of each person's friends plus a final end offset (dict)
+        :param neighbours: platform ('X' or 'FB') -> every person's sorted friend ids (dict)
+        '''
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.neighbours = neighbours
+
+    def __len__(self):
+        '''
+        :return: number of people in the network (int)
+        '''
+        return len(self.names)
+
+    def friends(self, person_id, social_media):
+        '''
+        :param person_id: id of the person (int)
+        :param social_media: 'X' or 'FB' (str)
+        :return: sorted ids of the person's friends (array)
+        '''
+        offsets = self.offsets[social_media]
+        return self.neighbours[social_media][offsets[person_id]:offsets[person_id + 1]]
+
+    def degree(self, person_id, social_media):
+        '''
+        :param person_id: id of the person (int)
+        :param social_media: 'X' or 'FB' (str)
+        :return: number of friends the person lists (int)
+        '''
+        offsets = self.offsets[social_media]
+        return offsets[person_id + 1] - offsets[person_id]
+
+    def friend_names(self, name, social_media):
+        '''
+        Looks up a person's friends by name, only converting ids back to names here for display
+        :param name: name of the person (str)
+        :param social_media: 'X' or 'FB' (str)
+        :return: names of the person's friends (lst)
+        '''
+        return [self.names[friend_id] for friend_id in self.friends(self.ids[name], social_media)]
+
+    def to_dict(self):
+        '''
+        Expands the network back into the nested dictionary used by the menu options
+        :return: nested dictionary of each person and their friends on each platform (dict)
+        '''
+        return {name: {'X': self.friend_names(name, 'X'), 'FB': self.friend_names(name, 'FB')} for name in self.names}
+
+
+def overlap_sizes(graph):
+    '''
+    Counts, for every person, how many friends they have on both X and FB, working on the integer id arrays of
+    a CompactGraph. Each person's two friend id ranges are already sorted, so they are merged in place: whichever
+    side is behind jumps forward to the other side's id with a binary search, which makes the merge cost about
+    the shorter list times the log of the longer one. No slices, sets or name strings are made per person.
+    :param graph: the friend network (CompactGraph)
+    :return: shared friend count of each person, indexed by id (array of int32)
+    '''
+    x_offsets, x_neighbours = graph.offsets['X'], graph.neighbours['X']
+    fb_offsets, fb_neighbours = graph.offsets['FB'], graph.neighbours['FB']
+    overlaps = array('i', bytes(4 * len(graph)))
+    for person_id in range(len(graph)):
+        i, x_end = x_offsets[person_id], x_offsets[person_id + 1]
+        j, fb_end = fb_offsets[person_id], fb_offsets[person_id + 1]
+        shared = 0
+        while i < x_end and j < fb_end:
+            x_id = x_neighbours[i]
+            fb_id = fb_neighbours[j]
+            if x_id < fb_id:
+                i = bisect_left(x_neighbours, fb_id, i + 1, x_end)
+            elif fb_id < x_id:
+                j = bisect_left(fb_neighbours, x_id, j + 1, fb_end)
+            else:
+                shared += 1
+                i += 1
+                j += 1
+        overlaps[person_id] = shared
+    return overlaps
+
+
+def top_overlaps(graph, k=10, overlaps=None):
+    '''
+    Finds the k people with the most friends on both X and FB
+    :param graph: the friend network (CompactGraph)
+    :param k: number of people to return (int)
+    :param overlaps: result of overlap_sizes, if already computed (array)
+    :return: (name, shared friend count) of each person, most shared first (lst of tuples)
+    '''
+    if overlaps is None:
+        overlaps = overlap_sizes(graph)
+    best = nlargest(k, range(len(overlaps)), key=overlaps.__getitem__)
+    return [(graph.names[person_id], overlaps[person_id]) for person_id in best]
+
+
+def make_csr(friend_id_lists, people):
+    '''
+    Packs one friend id list per person into offset and neighbour arrays
+    :param friend_id_lists: iterable of friend id lists, one per person in id order
+    :param people: number of people in the network (int)
+    :return: offsets (array of int64), neighbours (array of int32)
+    '''
+    offsets = array('q', [0])
+    neighbours = array('i')
+    for friend_ids in friend_id_lists:
+        neighbours.extend(sorted(set(friend_ids)))
+        offsets.append(len(neighbours))
+    while len(offsets) <= people:  # people with no line in the friend file have no friends
+        offsets.append(len(neighbours))
+    return offsets, neighbours
+
+
+def make_compact_graph(names_lst, twt_friends_list, fb_friends_list):
+    '''
+    Builds a CompactGraph straight from the friend lists read by read_x_or_fb or iter_x_or_fb, without turning
+    X ids into names first. Lists are consumed one at a time, so generators are never materialised.
+    :param names_lst: list of names (lst)
+    :param twt_friends_list: twitter friend id number lists, one per person (iterable of lsts)
+    :param fb_friends_list: fb friend name lists, one per person (iterable of lsts)
+    :return: the friend network (CompactGraph)
+    '''
+    ids = {name: i for i, name in enumerate(names_lst)}
+    people = len(names_lst)
+    x_ids = ([int(id_num) for id_num in id_num_list if id_num.isnumeric() and int(id_num) < people]
+             for id_num_list in islice(twt_friends_list, people))
+    fb_ids = ([ids[name] for name in name_list if name in ids] for name_list in islice(fb_friends_list, people))
+    x_offsets, x_neighbours = make_csr(x_ids, people)
+    fb_offsets, fb_neighbours = make_csr(fb_ids, people)
+    return CompactGraph(list(names_lst), {'X': x_offsets, 'FB': fb_offsets}, {'X': x_neighbours, 'FB': fb_neighbours})
+
+
+def load_compact_graph(fp_name, fp_x, fp_fb):
+    '''
+    Streams the names, X id and FB friend files into a CompactGraph one line at a time, so peak memory is the
+    finished graph rather than the graph plus every line of text. Closes each file.
+    :param fp_name: file pointer for name csv file
+    :param fp_x: file pointer for twt friend id txt file
+    :param fp_fb: file pointer for fb friend file
+    :return: the friend network (CompactGraph)
+    '''
+    names_lst = read_names(fp_name)
+    graph = make_compact_graph(names_lst, iter_x_or_fb(fp_x), iter_x_or_fb(fp_fb))
+    close_file(fp_name)
+    close_file(fp_x)
+    close_file(fp_fb)
+    return graph
+
+
+def source_stamps(source_paths):
+    '''
+    Records the size and modification time of each source file so a snapshot can tell when they have changed
+    :param source_paths: paths of the names, X id and FB friend files (lst of str)
+    :return: [absolute path, size, mtime in ns] for each file (lst of lsts)
+    '''
+    stamps = []
+    for path in source_paths:
+        stat = os.stat(path)
+        stamps.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return stamps
+
+
+def write_snapshot(snapshot_path, source_paths, people, sections):
+    '''
+    Writes a binary snapshot: a magic line, a JSON header (source file stamps, byte order and where each section
+    starts) and then each section's raw bytes, 8-byte aligned so read_snapshot can map them straight from disk.
+    The snapshot is written to a temporary file next to snapshot_path and renamed over it once complete, so an
+    interrupted write never leaves a truncated snapshot behind.
+    :param snapshot_path: file to write the snapshot to (str)
+    :param source_paths: paths of the names, X id and FB friend files the data was built from (lst of str)
+    :param people: number of people in the network (int)
+    :param sections: (section name, bytes or array) pairs to write in order (lst of tuples)
+    :return: nothing
+    '''
+    layout = {}
+    position = 0
+    for section_name, data in sections:
+        size = len(memoryview(data).cast('B'))
+        layout[section_name] = [position, size]
+        position += size + (-size % 8)
+    header = json.dumps({"sources": source_stamps(source_paths), "byteorder": sys.byteorder,
+                         "people": people, "layout": layout}).encode("utf-8")
+    data_start = len(SNAPSHOT_MAGIC) + 8 + len(header)
+    data_start += -data_start % 8
+
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(snapshot_path) + ".",
+                                     dir=os.path.dirname(os.path.abspath(snapshot_path)))
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(SNAPSHOT_MAGIC)
+            fp.write(len(header).to_bytes(8, "little"))
+            fp.write(header)
+            fp.write(b"\0" * (data_start - fp.tell()))
+            for section_name, data in sections:
+                size = len(memoryview(data).cast('B'))
+                fp.write(data)
+                fp.write(b"\0" * (-size % 8))
+        os.replace(temp_path, snapshot_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def read_snapshot(snapshot_path, source_paths):
+    '''
+    Maps a snapshot written by write_snapshot. Nothing is read past the header, so this takes milliseconds
+    however large the network is. Gives None if the snapshot is missing, unreadable, shorter than its header says
+    or was made from source files whose path, size or modification time no longer match.
+    :param snapshot_path: snapshot file to open (str)
+    :param source_paths: paths of the names, X id and FB friend files (lst of str)
+    :return: the JSON header (dict) and a function giving each section's bytes by name, or None
+    '''
+    try:
+        with open(snapshot_path, "rb") as fp:
+            if fp.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None
+            header_size = int.from_bytes(fp.read(8), "little")
+            header = json.loads(fp.read(header_size).decode("utf-8"))
+            if header["byteorder"] != sys.byteorder or header["sources"] != source_stamps(source_paths):
+                return None
+            data_start = len(SNAPSHOT_MAGIC) + 8 + header_size
+            data_start += -data_start % 8
+            data_end = data_start + max((start + size for start, size in header["layout"].values()), default=0)
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if len(mapped) < data_end:
+        return None
+
+    view = memoryview(mapped)
+
+    def section(section_name):
+        start, size = header["layout"][section_name]
+        return view[data_start + start:data_start + start + size]
+
+    return header, section
+
+
+def save_network_snapshot(names_lst, friends_dict, snapshot_path, source_paths):
+    '''
+    Writes the nested dictionary built by load_network to a binary snapshot, keeping everything load_network
+    gives: friends in file order, duplicates, ids or names that match nobody, and '' for empty lines. Each friend
+    is stored as a row of a string table that starts with names_lst; strings that are not a name go after it.
+    Each person has a status byte per platform: 0 if they have no entry, 1 for an empty line, 2 for a list.
+    :param names_lst: list of names (lst)
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param snapshot_path: file to write the snapshot to (str)
+    :param source_paths: paths of the names, X id and FB friend files the network was read from (lst of str)
+    :return: nothing
+    '''
+    table = list(names_lst)
+    rows = {name: i for i, name in enumerate(table)}
+    sections = []
+    for social_media in ('X', 'FB'):
+        status = array('b')
+        offsets = array('q', [0])
+        neighbours = array('i')
+        for name in names_lst:
+            friend_lst = friends_dict.get(name, {}).get(social_media)
+            if friend_lst is None:
+                status.append(0)
+            elif friend_lst == '':
+                status.append(1)
+            else:
+                status.append(2)
+                for friend in friend_lst:
+                    if friend not in rows:
+                        rows[friend] = len(table)
+                        table.append(friend)
+                    neighbours.append(rows[friend])
+            offsets.append(len(neighbours))
+        sections += [(social_media + " status", status), (social_media + " offsets", offsets),
+                     (social_media + " neighbours", neighbours)]
+    sections.insert(0, ("strings", json.dumps(table).encode("utf-8")))
+    write_snapshot(snapshot_path, source_paths, len(names_lst), sections)
+
+
+def load_network_snapshot(snapshot_path, source_paths):
+    '''
+    Rebuilds the names list and nested dictionary from a snapshot written by save_network_snapshot, skipping
+    the text parsing and id conversion of load_network. People are added in the same order load_network adds
+    them, so the dictionary iterates the same way.
+    :param snapshot_path: snapshot file to open (str)
+    :param source_paths: paths of the names, X id and FB friend files (lst of str)
+    :return: list of names (lst) and nested dictionary (dict), or None if the snapshot cannot be used
+    '''
+    snapshot = read_snapshot(snapshot_path, source_paths)
+    if snapshot is None:
+        return None
+    try:
+        return network_from_snapshot(*snapshot)
+    except (KeyError, IndexError, TypeError, ValueError):  # a damaged snapshot is no snapshot
+        return None
+
+
+def network_from_snapshot(header, section):
+    '''
+    Decodes the sections of a network snapshot, see load_network_snapshot
+    :param header: the snapshot's JSON header (dict)
+    :param section: gives a section's bytes by name (function)
+    :return: list of names (lst), nested dictionary of each person and their friends on each platform (dict)
+    '''
+    table = json.loads(bytes(section("strings")).decode("utf-8"))
+    names_lst = table[:header["people"]]
+    friends_dict = {}
+    for social_media in ('X', 'FB'):
+        status = section(social_media + " status").cast('b')
+        offsets = section(social_media + " offsets").cast('q')
+        neighbours = section(social_media + " neighbours").cast('i')
+        for i, name in enumerate(names_lst):
+            if status[i] == 0:
+                continue
+            if status[i] == 1:
+                friend_lst = ''
+            else:
+                friend_lst = list(map(table.__getitem__, neighbours[offsets[i]:offsets[i + 1]]))
+            if social_media == 'X':
+                friends_dict[name] = {'X': friend_lst}
+            else:
+                friends_dict.setdefault(name, {})['FB'] = friend_lst
+    return names_lst, friends_dict
+
+
+def open_network(names_file, x_file, fb_file, snapshot_path):
+    '''
+    Gives what load_network gives for the three source files, from the snapshot if it is still up to date,
+    otherwise by reading the files and writing a fresh snapshot for next time
+    :param names_file: path of the names file (str)
+    :param x_file: path of the twitter id file (str)
+    :param fb_file: path of the facebook friend file (str)
+    :param snapshot_path: snapshot file to use (str)
+    :return: list of names (lst), nested dictionary of each person and their friends on each platform (dict)
+    '''
+    source_paths = [names_file, x_file, fb_file]
+    with profile_stage("load_network_snapshot"):
+        network = load_network_snapshot(snapshot_path, source_paths)
+    if network is None:
+        network = load_network(open(names_file, "r"), open(x_file, "r"), open(fb_file, "r"))
+        with profile_stage("save_network_snapshot"):
+            try:
+                save_network_snapshot(network[0], network[1], snapshot_path, source_paths)
+            except OSError:  # a snapshot that cannot be written only costs speed next time
+                pass
+    return network
+
+
+def compact_graph_from_dict(friends_dict):
+    '''
+    Builds a CompactGraph from the nested friends dictionary, numbering people in dictionary order
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :return: the friend network (CompactGraph)
+    '''
+    names = list(friends_dict)
+    ids = {name: i for i, name in enumerate(names)}
+    offsets = {}
+    neighbours = {}
+    for social_media in ('X', 'FB'):
+        friend_ids = ([ids[friend] for friend in friends_dict[name][social_media] if friend in ids] for name in names)
+        offsets[social_media], neighbours[social_media] = make_csr(friend_ids, len(names))
+    return CompactGraph(names, offsets, neighbours)
+
+
+def answer_query(query, friends_dict, person_index, workers=1):
+    '''
+    Answers one batch query against an already loaded network. A query is a menu option number, followed by a
+    name for option 3 (e.g. "3 Richard Horn"), or "overlaps" and optionally how many people to list (e.g.
+    "overlaps 10") for the people with the most friends on both X and FB.
+    :param query: menu option and optional name (str)
+    :param friends_dict: nested dictionary of each person and their friends on each platform (dict)
+    :param person_index: sorted friend lists from make_person_index (dict)
+    :param workers: number of processes to count triangles with (int)
+    :return: the query and its answer, ready to be written as JSON (dict)
+    '''
+    option, _, name = query.strip().partition(" ")
+    answer = {'query': query.strip(), 'option': option}
+    if option in ('1', '2', '4'):
+        stats = network_statistics(friends_dict)
+        key = {'1': 'max intersect', '2': 'no shared percent', '4': 'more in x percent'}[option]
+        answer['result'] = stats[key]
+    elif option == '3':
+        name = name.strip()
+        if name in person_index:
+            answer['result'] = {'name': name, 'X': person_index[name]['X'], 'FB': person_index[name]['FB']}
+        else:
+            answer['error'] = "Invalid name or does not exist"
+    elif option in ('5', '6'):
+        x_total, fb_total = triangle_friendships(friends_dict, workers)
+        answer['result'] = x_total if option == '5' else fb_total
+    elif option == '7':
+        answer['result'] = both_triangle_friendships(friends_dict, workers)
+    elif option == '8':
+        answer['result'] = {social_media: [list(person) for person in most_triangle_friendships(friends_dict,
+                                                                                                  social_media)]
+                            for social_media in ('X', 'FB', 'both')}
+    elif option == 'overlaps':
+        k = int(name) if name.strip().isdigit() else 10
+        graph, overlaps = get_overlaps(friends_dict)
+        answer['result'] = [list(person) for person in top_overlaps(graph, k, overlaps)]
+    elif option in ('9', '10'):
+        largest = largest_k_core if option == '9' else largest_k_truss
+        answer['result'] = {social_media: list(largest(friends_dict, social_media))
+                            for social_media in ('X', 'FB', 'both')}
+    else:
+        answer['error'] = "Invalid option"
+    return answer
+
+
+def run_batch(names_file, x_file, fb_file, queries, out=sys.stdout, workers=1, snapshot_path=None):
+    '''
+    Loads the network once and writes the answer to every query as one JSON object per line. With a snapshot
+    path the network is opened from that snapshot when the source files have not changed since it was written.
+    :param names_file: path of the names file (str)
+    :param x_file: path of the twitter id file (str)
+    :param fb_file: path of the facebook friend file (str)
+    :param queries: menu option queries, see answer_query (iterable of str)
+    :param out: file to write the answers to
+    :param workers: number of processes to count triangles with (int)
+    :param snapshot_path: network snapshot file to read or refresh, see open_network (str)
+    :return: nothing
+    '''
+    if snapshot_path:
+        names_lst, friends_dict = open_network(names_file, x_file, fb_file, snapshot_path)
+    else:
+        names_lst, friends_dict = load_network(open(names_file, "r"), open(x_file, "r"), open(fb_file, "r"))
+    with profile_stage("make_person_index"):
+        person_index = make_person_index(friends_dict)
+    for query in queries:
+        if query.strip():
+            with profile_stage("option " + query.split()[0]):
+                answer = answer_query(query, friends_dict, person_index, workers)
+            out.write(json.dumps(answer) + "\n")
+
+
+def batch_main(args):
+    '''
+    Command line entry point for batch mode:
+        python triangle.py NAMES_FILE X_FILE FB_FILE [QUERIES_FILE]
+    Queries are read one per line from QUERIES_FILE, or from standard input if it is missing or "-". If the
+    TRIANGLE_SNAPSHOT environment variable names a file, the network is loaded from that snapshot.
+    :param args: command line arguments after the script name (lst of str)
+    :return: nothing
+    '''
+    if len(args) not in (3, 4):
+        print("usage: python triangle.py NAMES_FILE X_FILE FB_FILE [QUERIES_FILE]", file=sys.stderr)
+        sys.exit(2)
+    workers = int(os.environ.get(WORKERS_ENV, "1"))
+    snapshot_path = os.environ.get(SNAPSHOT_ENV)
+    if os.environ.get(PROFILE_ENV):
+        start_profiling()
+    if len(args) == 3 or args[3] == "-":
+        run_batch(args[0], args[1], args[2], sys.stdin, workers=workers, snapshot_path=snapshot_path)
+    else:
+        with open(args[3], "r") as fp_queries:
+            run_batch(args[0], args[1], args[2], fp_queries, workers=workers, snapshot_path=snapshot_path)
+    if _profile is not None:
+        write_profile_report(os.environ[PROFILE_ENV])
 
 
 def main():
+    workers = int(os.environ.get(WORKERS_ENV, "1"))
+    if os.environ.get(PROFILE_ENV):
+        start_profiling()
+
     # prompting for name file
     while True:
         input_name_file = input("\nEnter a names file ~:")
         fp_name = open_file(input_name_file)
-        if not fp_name:  # if open_file() does not return fp, reprompt
-            continue
-        else:
-            names_lst = read_names(fp_name)
+        if fp_name:  # if open_file() does not return fp, reprompt
             break
 
     # prompting for X id file
     while True:
         input_x_file = input("\n\nEnter the twitter id file ~:")
         fp_x = open_file(input_x_file)
-        if not fp_x:  # if open_file() does not return fp, reprompt
-            continue
-        else:
-            twt_friends_list = read_x_or_fb(fp_x)
-            twt_friends_list = id_num_to_name(twt_friends_list, names_lst)
+        if fp_x:  # if open_file() does not return fp, reprompt
             break
 
     # prompting for facebook id file
     while True:
         input_fb_file = input("\n\nEnter the facebook id file ~:")
         fp_fb = open_file(input_fb_file)
-        if not fp_fb:  # if open_file() does not return fp, reprompt
-            continue
-        else:
-            fb_friends_list = read_x_or_fb(fp_fb)
+        if fp_fb:  # if open_file() does not return fp, reprompt
             break
 
-    friends_dict = make_dict(twt_friends_list, fb_friends_list, names_lst, fp_name, fp_x, fp_fb)
+    snapshot_path = os.environ.get(SNAPSHOT_ENV)
+    if snapshot_path:
+        for fp in (fp_name, fp_x, fp_fb):
+            close_file(fp)
+        names_lst, friends_dict = open_network(fp_name.name, fp_x.name, fp_fb.name, snapshot_path)
+    else:
+        names_lst, friends_dict = load_network(fp_name, fp_x, fp_fb)
+    with profile_stage("make_person_index"):
+        person_index = make_person_index(friends_dict)
+        name_trie = make_name_trie(person_index)
 
     # prompting for options
     while True:
@@ -310,38 +1577,59 @@ def main():
         input_choice = input("Input a choice ~:")
         if not input_choice.isnumeric():
             print("Thank you")
+            if _profile is not None:
+                write_profile_report(os.environ[PROFILE_ENV])
             break
         else:
-            if input_choice == '1':
-                max_val, intersect_list = max_intersect(friends_dict)
-                print("\nThe Max number intersection of friends between X and Facebook is: {}".format(max_val))
-            if input_choice == '2':
-                max_val, intersect_list = max_intersect(friends_dict)
-                no_shared_percent = no_shared_friends(intersect_list)
-                print("\n{}% of people have no friends in common on X and Facebook".format(no_shared_percent))
             if input_choice == '3':
-                input_name = ''
-                while input_name not in names_lst:
+                while True:
                     input_name = input("Enter a person's name ~:")
-                    if input_name in names_lst:
-                        display_individual_info(input_name, friends_dict)
+                    if input_name in person_index:
                         break
                     else:
                         print("Invalid name or does not exist")
-                        continue
-            if input_choice == '4':
-                percent_more_in_x = more_in_x_than_fb(friends_dict)
-                print("{}% of people have more friends in X compared to Facebook".format(percent_more_in_x))
-            if input_choice == '5':
-                x_total, fb_total = triangle_friendships(friends_dict)
-                print("The number of triangle friendships in X is: {}".format(x_total))
-            if input_choice == '6':
-                x_total, fb_total = triangle_friendships(friends_dict)
-                print("The number of triangle friendships in Facebook is: {}".format(fb_total))
-            if input_choice == '7':
-                both_total = both_triangle_friendships(friends_dict)
-                print("The number of triangle friendships in X merged with Facebook is:  {}".format(both_total))
+                        suggestions = complete_name(name_trie, input_name)
+                        if suggestions:
+                            print("Did you mean: {}".format(", ".join(suggestions)))
+            with profile_stage("option " + input_choice):
+                if input_choice == '1':
+                    max_val = network_statistics(friends_dict)['max intersect']
+                    print("\nThe Max number intersection of friends between X and Facebook is: {}".format(max_val))
+                if input_choice == '2':
+                    no_shared_percent = network_statistics(friends_dict)['no shared percent']
+                    print("\n{}% of people have no friends in common on X and Facebook".format(no_shared_percent))
+                if input_choice == '3':
+                    display_individual_info(input_name, friends_dict, person_index)
+                if input_choice == '4':
+                    percent_more_in_x = network_statistics(friends_dict)['more in x percent']
+                    print("{}% of people have more friends in X compared to Facebook".format(percent_more_in_x))
+                if input_choice == '5':
+                    x_total, fb_total = triangle_friendships(friends_dict, workers)
+                    print("The number of triangle friendships in X is: {}".format(x_total))
+                if input_choice == '6':
+                    x_total, fb_total = triangle_friendships(friends_dict, workers)
+                    print("The number of triangle friendships in Facebook is: {}".format(fb_total))
+                if input_choice == '7':
+                    both_total = both_triangle_friendships(friends_dict, workers)
+                    print("The number of triangle friendships in X merged with Facebook is:  {}".format(both_total))
+                if input_choice == '8':
+                    for social_media, network in (('X', 'X'), ('FB', 'Facebook'), ('both', 'X merged with Facebook')):
+                        print("\nPeople in the most triangle friendships in {}:".format(network))
+                        for name, triangles, clustering in most_triangle_friendships(friends_dict, social_media):
+                            print("{:30s}{:>6d} triangles   clustering {:.3f}".format(name, triangles, clustering))
+                if input_choice == '9':
+                    for social_media, network in (('X', 'X'), ('FB', 'Facebook'), ('both', 'X merged with Facebook')):
+                        k, people = largest_k_core(friends_dict, social_media)
+                        print("The largest k-core in {} is the {}-core, with {} people".format(network, k, people))
+                if input_choice == '10':
+                    for social_media, network in (('X', 'X'), ('FB', 'Facebook'), ('both', 'X merged with Facebook')):
+                        k, friendships = largest_k_truss(friends_dict, social_media)
+                        print("The largest k-truss in {} is the {}-truss, with {} friendships".format(network, k,
+                                                                                                     friendships))
 
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,49 @@
+import os
+import pickle
+import shutil
+import tempfile
+from yugioh import read_card_data, csv_stamp
+
+def test_card_cache():
+
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, "card_data_tiny.csv")
+    cache_path = csv_path + ".cache"
+    shutil.copyfile("../card_data_tiny.csv", csv_path)
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    instructor_card_data = read_card_data(fp)
+    fp.close()
+
+    # Test 1: the first read parses the csv file and writes the cache, and nothing else
+    fp = open(csv_path, encoding="utf-8")
+    assert read_card_data(fp, cache_path) == instructor_card_data
+    fp.close()
+    assert sorted(os.listdir(directory)) == ["card_data_tiny.csv", "card_data_tiny.csv.cache"]
+
+    # Test 2: a cache hit gives back what is in the cache without reading the csv file
+    fp = open(csv_path, encoding="utf-8")
+    stamp = csv_stamp(fp)
+    with open(cache_path, "wb") as cache_fp:
+        pickle.dump((stamp, instructor_card_data[:3]), cache_fp, protocol=5)
+    assert read_card_data(fp, cache_path) == instructor_card_data[:3]
+    fp.close()
+
+    # Test 3: changing the csv file's modification time makes the cache stale
+    os.utime(csv_path, ns=(stamp[2] + 10 ** 9, stamp[2] + 10 ** 9))
+    fp = open(csv_path, encoding="utf-8")
+    assert read_card_data(fp, cache_path) == instructor_card_data
+    fp.close()
+
+    # Test 4: a cache that cannot be unpickled or unpacked is a miss, not an error
+    for contents in (b"", b"not a pickle", pickle.dumps(None), pickle.dumps((1, 2, 3))):
+        with open(cache_path, "wb") as cache_fp:
+            cache_fp.write(contents)
+        fp = open(csv_path, encoding="utf-8")
+        assert read_card_data(fp, cache_path) == instructor_card_data
+        fp.close()
+
+    shutil.rmtree(directory)
+
+
+test_card_cache()
@@ -0,0 +1,53 @@
+import csv
+from yugioh import read_card_data, read_card_table, make_search_index, search_cards, compute_stats
+
+def test_card_table():
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_data = read_card_data(fp)
+    fp.close()
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_table = read_card_table(fp)
+    fp.close()
+
+    # Test 1: the table holds the same cards in the same order, and its columns share the cards' strings
+    assert card_table.card_data == card_data
+    assert len(card_table) == len(card_data)
+    for row, card in enumerate(card_table.card_data):
+        for category_index in range(6):
+            assert card_table.columns[category_index][row] is card[category_index]
+        assert card_table.prices["tcgplayer price"][row] == card[6]
+
+    # Test 2: the other four price columns line up with the cards
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    csv_prices = {}
+    for row in list(csv.reader(fp))[1:]:
+        csv_prices.setdefault((row[0], row[1][:45]), []).append([float(price) for price in row[7:11]])
+    fp.close()
+    for row, card in enumerate(card_table.card_data):
+        other_prices = [card_table.prices[price_column][row]
+                        for price_column in ("cardmarket price", "ebay price", "amazon price", "coolstuffinc price")]
+        assert other_prices in csv_prices[(card[0], card[1])]
+
+    # Test 3: option 1's stats are the same as compute_stats
+    assert card_table.compute_stats() == compute_stats(card_data)
+    min_price, max_price, median_price, total = card_table.price_stats()
+    assert (min_price, max_price, median_price) == (card_data[0][6], card_data[-1][6], card_data[len(card_data) // 2][6])
+    assert round(total, 2) == round(sum(card[6] for card in card_data), 2)
+
+    # Test 4: searches give row numbers of the same cards as search_cards, with the same stats
+    search_index = make_search_index(card_data)
+    queries = [("Dark Magician", 1), ("Darklord", 5), ("Dragon", 4), ("Spell Card", 2), ("Ma", 1), ("", 5),
+               ("destroy", 3), ("not a card name", 1), ("8", 0)]
+    for query, category_index in queries:
+        instructor_results = search_cards(card_data, query, category_index)
+        for index in (None, search_index):
+            rows = card_table.search(query, category_index, index)
+            assert card_table.cards(rows) == instructor_results, query
+            if instructor_results:
+                assert card_table.compute_stats(rows) == compute_stats(instructor_results), query
+    assert card_table.compute_stats(card_table.search("not a card name", 1)) == ([], 0, [], 0, [], 0)
+
+
+test_card_table()
@@ -0,0 +1,35 @@
+from yugioh import read_card_data, make_card_index, read_decklist
+
+def test_make_card_index():
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_data = read_card_data(fp)
+    fp.close()
+
+    card_index = make_card_index(card_data)
+
+    # every card can be found by its id number
+    for card in card_data:
+        assert card in card_index[int(card[0])]
+    assert sum(len(cards) for cards in card_index.values()) == len(card_data)
+
+    # decklists give the same cards with and without the index
+    deck_fp = open("../kashsisters_meta_deck.ydk", encoding="utf-8")
+    instructor_decklist = []
+    next(deck_fp, None)
+    for line in deck_fp:
+        if line.strip().isdigit():
+            for card in card_data:
+                if int(line) == int(card[0]):
+                    instructor_decklist.append(card)
+    deck_fp.close()
+    instructor_decklist.sort(key=lambda card: (card[6], card[1]))
+
+    deck_fp = open("../kashsisters_meta_deck.ydk", encoding="utf-8")
+    student_decklist = read_decklist(deck_fp, card_data, card_index)
+    deck_fp.close()
+
+    assert instructor_decklist == student_decklist
+
+
+test_make_card_index()
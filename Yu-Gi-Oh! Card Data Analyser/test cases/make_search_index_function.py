@@ -0,0 +1,20 @@
+from yugioh import read_card_data, make_search_index, search_cards
+
+def test_make_search_index():
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_data = read_card_data(fp)
+    fp.close()
+
+    search_index = make_search_index(card_data)
+
+    # the index must give the same cards, in the same order, as searching every card
+    queries = [("Dark Magician", 1), ("Darklord", 5), ("Dragon", 4), ("Spell Card", 2), ("Ma", 1), ("", 5),
+               ("destroy", 3), ("Blue-Eyes", 5), ("not a card name", 1), ("8", 0)]
+    for query, category_index in queries:
+        instructor_results = search_cards(card_data, query, category_index)
+        student_results = search_cards(card_data, query, category_index, search_index)
+        assert instructor_results == student_results, query
+
+
+test_make_search_index()
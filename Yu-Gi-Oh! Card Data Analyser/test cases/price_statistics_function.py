@@ -0,0 +1,28 @@
+from yugioh import price_statistics, compute_stats
+
+def test_price_statistics():
+
+    card_data = [('1', 'Card A', 'Spell Card', '', 'Normal', '', 0.5),
+                 ('2', 'Card B', 'Spell Card', '', 'Normal', '', 0.1),
+                 ('3', 'Card C', 'Trap Card', '', 'Normal', '', 2.0),
+                 ('4', 'Card D', 'Trap Card', '', 'Normal', '', 0.3),
+                 ('5', 'Card E', 'Effect Monster', '', 'Dragon', '', 0.3)]
+
+    # Test 1: unsorted cards still give the middle price in price order
+    stats = price_statistics(card_data, percentiles=(0, 50, 100))
+    assert stats['count'] == 5
+    assert round(stats['total'], 2) == 3.2
+    assert round(stats['mean price'], 2) == 0.64
+    assert stats['min price'] == 0.1 and stats['min cards'] == [card_data[1]]
+    assert stats['max price'] == 2.0 and stats['max cards'] == [card_data[2]]
+    assert stats['median price'] == 0.3 and stats['median cards'] == [card_data[3], card_data[4]]
+    assert stats['percentiles'] == {0: 0.1, 50: 0.3, 100: 2.0}
+
+    # Test 2: compute_stats gives the same answer
+    assert compute_stats(card_data) == ([card_data[1]], 0.1, [card_data[2]], 2.0, [card_data[3], card_data[4]], 0.3)
+
+    # Test 3: no cards
+    assert price_statistics([])['count'] == 0
+
+
+test_price_statistics()
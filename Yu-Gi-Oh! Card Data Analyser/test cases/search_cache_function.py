@@ -0,0 +1,38 @@
+from yugioh import read_card_data, make_search_index, search_cards, compute_stats, CardTable, SearchCache
+
+def test_search_cache():
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_data = read_card_data(fp)
+    fp.close()
+
+    search_cache = SearchCache(CardTable(card_data), make_search_index(card_data), maxsize=2)
+
+    # Test 1: a miss searches and works out the stats, a repeat is a hit with the same answer
+    found_cards, stats = search_cache.search("Dragon", 4)
+    assert found_cards == search_cards(card_data, "Dragon", 4)
+    assert stats == compute_stats(found_cards)
+    assert search_cache.search("Dragon", 4) == (found_cards, stats)
+    assert (search_cache.hits, search_cache.misses) == (1, 1)
+
+    # Test 2: no matching cards gives no stats
+    assert search_cache.search("not a card name", 1) == ([], None)
+    assert (search_cache.hits, search_cache.misses) == (1, 2)
+
+    # Test 3: a hit makes the search the most recently used, so the other one is dropped when the cache is full
+    search_cache.search("Dragon", 4)
+    search_cache.search("Spell Card", 2)
+    assert list(search_cache.entries) == [("Dragon", 4), ("Spell Card", 2)]
+    assert (search_cache.hits, search_cache.misses) == (2, 3)
+    search_cache.search("not a card name", 1)
+    assert (search_cache.hits, search_cache.misses) == (2, 4)
+    assert list(search_cache.entries) == [("Spell Card", 2), ("not a card name", 1)]
+
+    # Test 4: reloading forgets every cached search
+    search_cache.reload(CardTable(card_data[:10]))
+    assert len(search_cache.entries) == 0
+    assert search_cache.search("Dragon", 4)[0] == search_cards(card_data[:10], "Dragon", 4)
+    assert search_cache.misses == 5
+
+
+test_search_cache()
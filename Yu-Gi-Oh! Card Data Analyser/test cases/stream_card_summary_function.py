@@ -0,0 +1,66 @@
+import csv
+import os
+import shutil
+import tempfile
+from yugioh import read_card_data, iter_card_data, compute_stats, stream_card_summary, external_sort_card_data
+
+def write_reversed_cards(directory):
+    '''
+    copies card_data_tiny.csv with its cards in reverse order, so cards with the same price are not in name order
+    directory: folder to write the copy to (str)
+    returns: path of the copy (str)
+    '''
+    with open("../card_data_tiny.csv", encoding="utf-8", newline="") as fp:
+        rows = list(csv.reader(fp))
+    path = os.path.join(directory, "reversed.csv")
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        csv.writer(fp).writerows(rows[:1] + rows[:0:-1])
+    return path
+
+
+def test_stream_card_summary():
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_data = read_card_data(fp)
+    fp.close()
+    min_cards, min_price, max_cards, max_price, med_cards, med_price = compute_stats(card_data)
+    assert len(min_cards) > 1
+
+    # Test 1: the streamed summary matches option 1, cards in the same (price, name) order
+    directory = tempfile.mkdtemp()
+    fp = open(write_reversed_cards(directory), encoding="utf-8")
+    summary = stream_card_summary(fp)
+    fp.close()
+    shutil.rmtree(directory)
+    assert summary['count'] == len(card_data)
+    assert round(summary['total'], 2) == round(sum(card[6] for card in card_data), 2)
+    assert summary['cheapest'] == card_data[:50]
+    assert summary['min price'] == min_price and summary['min cards'] == min_cards
+    assert summary['max price'] == max_price and summary['max cards'] == max_cards
+    assert summary['median price'] == med_price and summary['median cards'] == med_cards
+
+
+def test_external_sort_card_data():
+
+    fp = open("../card_data_tiny.csv", encoding="utf-8")
+    card_data = read_card_data(fp)
+    fp.close()
+
+    # Test 2: merging small sorted chunks gives the read_card_data order, ties broken by name
+    directory = tempfile.mkdtemp()
+    reversed_path = write_reversed_cards(directory)
+    out_path = os.path.join(directory, "sorted.csv")
+    for chunk_size in (7, 50, len(card_data) + 1):
+        fp = open(reversed_path, encoding="utf-8")
+        written = external_sort_card_data(fp, out_path, chunk_size)
+        fp.close()
+        assert written == len(card_data)
+
+        out_fp = open(out_path, encoding="utf-8", newline="")
+        assert list(iter_card_data(out_fp)) == card_data, chunk_size
+        out_fp.close()
+    shutil.rmtree(directory)
+
+
+test_stream_card_summary()
+test_external_sort_card_data()
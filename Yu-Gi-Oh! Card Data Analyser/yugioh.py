@@ -14,6 +14,16 @@
 
 import csv
 import math
+import os
+import pickle
+import random
+import sys
+import tempfile
+from heapq import merge, nsmallest
+from itertools import islice
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from operator import itemgetter
 
 MENU = "\nYu-Gi-Oh! Card Data Analysis" \
@@ -25,6 +35,18 @@ MENU = "\nYu-Gi-Oh! Card Data Analysis" \
 
 CATEGORIES = ["id", "name", "type", "desc", "race", "archetype", "card price"]
 
+NGRAM_LENGTH = 3  # length of the character runs in the search index
+
+CACHE_ENV = "YUGIOH_CARD_CACHE"  # set to any value to make main cache parsed card data next to the csv file
+CACHE_SUFFIX = ".cache"
+
+SEARCH_CACHE_SIZE = 256  # most recent searches kept by SearchCache
+
+DISPLAY_LIMIT = 50  # cards shown by display_data
+SORT_CHUNK_SIZE = 100000  # cards sorted in memory at a time by external_sort_card_data
+
+PRICE_COLUMNS = ["tcgplayer price", "cardmarket price", "ebay price", "amazon price", "coolstuffinc price"]
+
 
 def open_file(prompt_str):
     '''
@@ -43,41 +65,258 @@ def open_file(prompt_str):
     return fp
 
 
-def read_card_data(fp):
+def iter_card_data(fp):
+    '''
+    reads csv file one row at a time
+        yields the first seven values of each row as a tuple, in file order
+    fp: file pointer to csv file
+    returns: generator of cards (tuples)
+    '''
+    reader = csv.reader(fp)
+    next(reader, None)
+    for individual_card in reader:
+        yield make_card(individual_card)
+
+
+def make_card(individual_card):
+    '''
+    turns one csv row into a card: its first seven values, with the name cut to 45 characters and the price as a
+    float
+    individual_card: csv row (list of str)
+    returns: card (tuple)
+    '''
+    one_card_list = []
+    for index, element in enumerate(individual_card):
+        if index <= 6:
+            if index == 1:
+                element = element[:45]
+            if index == 6:
+                element = float(element)
+            one_card_list.append(element)
+    return tuple(one_card_list)
+
+
+def csv_stamp(fp):
+    '''
+    identifies a csv file by its path, size and modification time, so a cache made from it can tell when it
+    has changed
+    fp: file pointer to csv file
+    returns: absolute path (str), size in bytes (int), modification time in ns (int)
+    '''
+    stat = os.fstat(fp.fileno())
+    return os.path.abspath(fp.name), stat.st_size, stat.st_mtime_ns
+
+
+def load_card_cache(cache_path, stamp):
+    '''
+    reads parsed card data back from a cache file written by read_card_data. a cache that cannot be read back for
+    any reason (missing, truncated, from another version of this program) counts as no cache.
+    cache_path: cache file (str)
+    stamp: csv_stamp of the csv file the cards should come from (tuple)
+    returns: all cards (list of tuples), or None if there is no usable cache for that csv file
+    '''
+    try:
+        with open(cache_path, "rb") as cache_fp:
+            cached_stamp, card_data = pickle.load(cache_fp)
+    except Exception:  # unpickling can fail with almost any exception
+        return None
+    if cached_stamp != stamp:
+        return None
+    return card_data
+
+
+def read_card_data(fp, cache_path=None):
     '''
     creates list of tuples of all cards in deck
         reads csv file
                 adds first seven values of each row to a list
             converted to a tuple, and added to another list
         list of tuples is sorted by price, then name.
+        with a cache_path, the sorted list is saved there (pickle protocol 5) and reused on later calls until
+        the csv file's path, size or modification time changes. the cache is written to a temporary file and
+        then renamed into place, so an interrupted write never leaves a half-written cache behind.
     fp: file pointer to csv file
+    cache_path: file to keep the parsed cards in (str)
     returns: all cards (rows) and their first seven values (list of tuples)
     '''
-    card_data = []
+    if cache_path is not None:
+        stamp = csv_stamp(fp)
+        card_data = load_card_cache(cache_path, stamp)
+        if card_data is not None:
+            return card_data
+
+    card_data = list(iter_card_data(fp))
+    card_data.sort(key=itemgetter(6, 1))  # sort first by price, then name
+
+    if cache_path is not None:
+        save_card_cache(cache_path, stamp, card_data)
+    return card_data
+
+
+def save_card_cache(cache_path, stamp, card_data):
+    '''
+    writes parsed card data to a cache file for load_card_cache (pickle protocol 5). the cache is written to a
+    temporary file and then renamed into place, so an interrupted write never leaves a half-written cache behind.
+    a cache that cannot be written is skipped, as it only costs speed.
+    cache_path: cache file (str)
+    stamp: csv_stamp of the csv file the cards come from (tuple)
+    card_data: parsed cards (list of tuples or CardTable)
+    returns: nothing
+    '''
+    temp_path = None
+    try:
+        temp_fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(cache_path) + ".",
+                                              dir=os.path.dirname(os.path.abspath(cache_path)))
+        with os.fdopen(temp_fd, "wb") as cache_fp:
+            pickle.dump((stamp, card_data), cache_fp, protocol=5)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class CardTable:
+    def __init__(self, card_data, other_prices=None):
+        '''
+        column view of cards in read_card_data's (price, name) order: a list per text category holding the same
+        string objects as the card tuples, so no text is copied, and an array('d') per price column. filters give
+        arrays of row numbers instead of copied card lists, and because rows are in price order the price
+        statistics of any filter are read off by position and bisection instead of regrouping the cards.
+        card_data: all cards in price, name order (list of tuples)
+        other_prices: cardmarket, ebay, amazon and coolstuffinc price of each card in card_data order, keyed by
+                      their PRICE_COLUMNS name (dict of str: array)
+        '''
+        self.card_data = card_data
+        self.columns = [[card[index] for card in card_data] for index in range(6)]
+        self.prices = {PRICE_COLUMNS[0]: array('d', (card[6] for card in card_data))}
+        self.prices.update(other_prices or {})
+        self.columns.append(self.prices[PRICE_COLUMNS[0]])  # so every category index has a column
+
+    def __len__(self):
+        '''
+        returns: number of cards (int)
+        '''
+        return len(self.card_data)
+
+    def cards(self, rows=None):
+        '''
+        rows: row numbers of the cards, all cards if not given (iterable of int)
+        returns: the cards, as read_card_data gives them (list of tuples)
+        '''
+        if rows is None:
+            return self.card_data
+        return [self.card_data[row] for row in rows]
+
+    def search(self, query, category_index, search_index=None):
+        '''
+        finds the cards with the query in the given category, like search_cards
+        query: phrase user is searching for (str)
+        category_index: index of the category to search (int)
+        search_index: inverted index of the table's card_data from make_search_index (SearchIndex)
+        returns: row numbers of the matching cards, in price order (array of int)
+        '''
+        column = self.columns[category_index]
+        return array('i', (row for row in search_candidates(query, category_index, len(self), search_index)
+                           if query in column[row]))
+
+    def price_stats(self, rows=None, price_column=PRICE_COLUMNS[0]):
+        '''
+        computes the minimum, maximum, median and total of a price column with reductions over its array. the
+        median is the middle price in price order, like compute_stats.
+        rows: row numbers in increasing order, all cards if not given (array of int)
+        price_column: one of PRICE_COLUMNS (str)
+        returns: min price (float), max price (float), median price (float), total (float)
+        '''
+        prices = self.prices[price_column]
+        if rows is not None:
+            prices = array('d', map(prices.__getitem__, rows))
+        if not prices:
+            return 0.0, 0.0, 0.0, 0.0
+        if price_column == PRICE_COLUMNS[0]:
+            median_price = prices[len(prices) // 2]  # rows are in tcgplayer price order
+        else:
+            median_price = quickselect(array('d', prices), len(prices) // 2)
+        return min(prices), max(prices), median_price, math.fsum(prices)
+
+    def compute_stats(self, rows=None):
+        '''
+        gives what compute_stats gives for the cards in rows. rows are in price order, so the cards sharing a
+        price are next to each other and are found by bisecting the tcgplayer price array.
+        rows: row numbers in increasing order, all cards if not given (array of int)
+        returns: cards with min price (list), min price, cards with max price (list), max price, cards with median
+        price (list), median price
+        '''
+        prices = self.prices[PRICE_COLUMNS[0]]
+        if rows is None:
+            rows = range(len(self))
+        else:
+            prices = array('d', map(prices.__getitem__, rows))
+        if not prices:
+            return [], 0, [], 0, [], 0
+        stats = []
+        for price in (prices[0], prices[-1], prices[len(prices) // 2]):
+            start, end = bisect_left(prices, price), bisect_right(prices, price)
+            stats += [self.cards(rows[start:end]), price]
+        return tuple(stats)
+
+
+def read_card_table(fp, cache_path=None):
+    '''
+    reads a card csv file into a CardTable: the same cards as read_card_data, in the same order, plus the
+    other four price columns. values of the type, race and archetype categories repeat across many cards, so
+    each distinct value is kept once and shared by every card that has it.
+        with a cache_path, the table is cached like read_card_data caches its cards
+    fp: file pointer to csv file
+    cache_path: file to keep the parsed table in (str)
+    returns: all cards (CardTable)
+    '''
+    if cache_path is not None:
+        stamp = csv_stamp(fp) + ("table",)
+        card_table = load_card_cache(cache_path, stamp)
+        if isinstance(card_table, CardTable):
+            return card_table
+
+    shared = {}
+    rows = []
     reader = csv.reader(fp)
     next(reader, None)
     for individual_card in reader:
-        one_card_list = []
-        for index, element in enumerate(individual_card):
-            if index <= 6:
-                if index == 1:
-                    element = element[:45]
-                if index == 6:
-                    element = float(element)
-                one_card_list.append(element)
-        one_card_tuple = tuple(one_card_list)
-        card_data.append(one_card_tuple)
-    card_data.sort(key=itemgetter(6, 1))  # sort first by price, then name
-    return card_data
+        card = tuple(shared.setdefault(element, element) if index in (2, 4, 5) else element
+                     for index, element in enumerate(make_card(individual_card)))
+        rows.append((card, [float(price) for price in individual_card[7:11]]))
+    rows.sort(key=lambda row: (row[0][6], row[0][1]))  # sort first by price, then name
+    other_prices = {price_column: array('d', (row[1][index] for row in rows))
+                    for index, price_column in enumerate(PRICE_COLUMNS[1:])}
+    card_table = CardTable([row[0] for row in rows], other_prices)
+
+    if cache_path is not None:
+        save_card_cache(cache_path, stamp, card_table)
+    return card_table
+
+
+def make_card_index(card_data):
+    '''
+    creates a dictionary from each card's id number to the cards with that id, so cards can be found by id
+    without searching card_data. id numbers are converted to int once here.
+    card_data: all cards in file (list of tuples)
+    returns: id number to cards with that id (dict of int: list of tuples)
+    '''
+    card_index = {}
+    for card in card_data:
+        card_index.setdefault(int(card[0]), []).append(card)
+    return card_index
 
 
-def read_decklist(fp, card_data):
+def read_decklist(fp, card_data, card_index=None):
     '''
     creates a list of cards in a decklist from card_data, given id numbers in a ydk file
     fp: file pointer to a csv file
     card_data: all cards in file (list of tuples)
+    card_index: id number to cards, from make_card_index (dict). built from card_data if not given
     returns: cards in decklist (list of tuples)
     '''
+    if card_index is None:
+        card_index = make_card_index(card_data)
     decklist_data = []
     next(fp, None)
     for id_num in fp:
@@ -85,68 +324,360 @@ def read_decklist(fp, card_data):
             id_num = int(id_num)
         except ValueError:  # skips lines that are not id numbers
             continue
-        for card in card_data:
-            if id_num == int(card[0]):  # if card is in decklist
-                decklist_data.append(card)
+        decklist_data.extend(card_index.get(id_num, []))  # if card is in decklist
     decklist_data.sort(key=itemgetter(6, 1))  # sort first by price, then name
     return decklist_data
 
 
-def search_cards(card_data, query, category_index):
+def index_category(card_data, category_index):
+    '''
+    creates an inverted index of one text category, from each n-gram (run of NGRAM_LENGTH characters) to the
+    positions in card_data of the cards whose value in that category contains it. a query can only be in a value
+    that has all of the query's n-grams, so only those cards need to be checked.
+        values shorter than NGRAM_LENGTH are indexed whole
+        positions are added in card_data order, so each array is sorted
+    card_data: all cards in file (list of tuples)
+    category_index: index of the text category to index (int)
+    returns: n-gram to card positions (dict of str: array of int)
+    '''
+    category_grams = {}
+    for position, card in enumerate(card_data):
+        element = card[category_index]
+        if len(element) < NGRAM_LENGTH:
+            grams = {element}
+        else:
+            grams = {element[i:i + NGRAM_LENGTH] for i in range(len(element) - NGRAM_LENGTH + 1)}
+        for gram in grams:
+            if gram in category_grams:
+                category_grams[gram].append(position)
+            else:
+                category_grams[gram] = array('i', [position])
+    return category_grams
+
+
+class SearchIndex:
+    def __init__(self, card_data):
+        '''
+        inverted indexes of the text categories of card_data, see index_category. a category is only indexed the
+        first time it is searched, so loading costs nothing and categories that are never searched (desc is by
+        far the largest) are never indexed.
+        card_data: all cards in file (list of tuples)
+        '''
+        self.card_data = card_data
+        self.categories = {}
+
+    def __contains__(self, category_index):
+        '''
+        category_index: index of a category (int)
+        returns: whether the category is a text category that can be indexed (bool)
+        '''
+        return 0 <= category_index < CATEGORIES.index("card price")
+
+    def __getitem__(self, category_index):
+        '''
+        category_index: index of a text category (int)
+        returns: n-gram to card positions for that category, indexing it now if it has not been yet (dict)
+        '''
+        if category_index not in self.categories:
+            self.categories[category_index] = index_category(self.card_data, category_index)
+        return self.categories[category_index]
+
+
+def make_search_index(card_data):
+    '''
+    creates a search index for card_data whose categories are indexed as they are first searched
+    card_data: all cards in file (list of tuples)
+    returns: inverted index of every text category (SearchIndex)
+    '''
+    return SearchIndex(card_data)
+
+
+def search_candidates(query, category_index, card_count, search_index=None):
+    '''
+    finds the positions of the cards that can have the query in the given category: the cards containing every
+    n-gram of the query, or every card if there is no search index or the query is too short to narrow down
+    query: phrase user is searching for (str)
+    category_index: index of the category to search (int)
+    card_count: number of cards searched (int)
+    search_index: inverted index from make_search_index (SearchIndex)
+    returns: card positions in increasing order (iterable of int)
+    '''
+    if search_index is None or category_index not in search_index or len(query) < NGRAM_LENGTH:
+        return range(card_count)
+    category_grams = search_index[category_index]
+    postings = []
+    for i in range(len(query) - NGRAM_LENGTH + 1):
+        gram = query[i:i + NGRAM_LENGTH]
+        if gram not in category_grams:
+            return []
+        postings.append(category_grams[gram])
+    postings.sort(key=len)
+    return sorted(set(postings[0]).intersection(*postings[1:]))  # keep card_data order
+
+
+def search_cards(card_data, query, category_index, search_index=None):
     '''
     searches through the given category index in each card
         adds the card to a list if the query is present in the given category.
+        with a search index, only cards containing every n-gram of the query are checked
     card_data: all cards in file (list of tuples)
     query: phrase user is searching for (str)
     category_index: index of the category to search (int)
+    search_index: inverted index from make_search_index (SearchIndex). every card is checked if not given
     returns: cards with the given query (list)
     '''
     found_cards = []
-    for card in card_data:
-        for index, element in enumerate(card):
-            if index == category_index:
-                if query in element:
-                    found_cards.append(card)
+    for position in search_candidates(query, category_index, len(card_data), search_index):
+        card = card_data[position]
+        if query in card[category_index]:
+            found_cards.append(card)
     return found_cards
 
 
+class SearchCache:
+    def __init__(self, card_table, search_index=None, maxsize=SEARCH_CACHE_SIZE):
+        '''
+        keeps the results and price stats of the most recent searches, dropping the least recently used one when
+        full. entries are keyed by the query and the category index, so category names typed in any case share
+        an entry; queries are kept as typed because searching is case-sensitive. results are kept as arrays of
+        row numbers rather than lists of cards.
+        card_table: all cards in file (CardTable)
+        search_index: inverted index of the table's cards from make_search_index (SearchIndex)
+        maxsize: most searches to keep (int)
+        '''
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.reload(card_table, search_index)
+
+    def __str__(self):
+        '''
+        returns: the size and hit/miss counts of the cache (str)
+        '''
+        return "{} of {} searches cached, {} hits, {} misses".format(len(self.entries), self.maxsize, self.hits,
+                                                                      self.misses)
+
+    def reload(self, card_table, search_index=None):
+        '''
+        switches to newly loaded card data, forgetting every cached search
+        card_table: all cards in file (CardTable)
+        search_index: inverted index of the table's cards from make_search_index (SearchIndex)
+        returns: nothing
+        '''
+        self.card_table = card_table
+        self.search_index = search_index
+        self.entries.clear()
+
+    def search(self, query, category_index):
+        '''
+        gives the cards matching a search and their compute_stats result, from the cache if possible
+        query: phrase user is searching for (str)
+        category_index: index of the category to search (int)
+        returns: cards with the given query (list), compute_stats of those cards or None if there are none (tuple)
+        '''
+        key = (query, category_index)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            rows, stats = self.entries[key]
+            return self.card_table.cards(rows), stats
+        self.misses += 1
+        rows = self.card_table.search(query, category_index, self.search_index)
+        stats = self.card_table.compute_stats(rows) if rows else None
+        self.entries[key] = (rows, stats)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return self.card_table.cards(rows), stats
+
+
+def quickselect(values, k):
+    '''
+    finds the k-th smallest value (counting from 0) without sorting, by repeatedly splitting the values into those
+    below, equal to and above a random pivot and keeping only the part that holds position k. takes linear time on
+    average and works in place, so no copy of the values is made.
+    values: numbers to select from, reordered by the selection (list or array)
+    k: position in sorted order (int)
+    returns: the k-th smallest value
+    '''
+    low, high = 0, len(values) - 1
+    while True:
+        pivot = values[random.randint(low, high)]
+        below, index, above = low, low, high  # values[low:below] < pivot, values[above + 1:high + 1] > pivot
+        while index <= above:
+            value = values[index]
+            if value < pivot:
+                values[index] = values[below]
+                values[below] = value
+                below += 1
+                index += 1
+            elif value > pivot:
+                values[index] = values[above]
+                values[above] = value
+                above -= 1
+            else:
+                index += 1
+        if k < below:
+            high = below - 1
+        elif k > above:
+            low = above + 1
+        else:
+            return pivot
+
+
+def price_at_percentile(prices, percentile, in_order=False):
+    '''
+    finds the price at a percentile, by the nearest rank below it (the 50th percentile is the same middle price
+    compute_stats uses as the median)
+    prices: card prices, reordered unless in_order (list or array of float)
+    percentile: 0 to 100 (float)
+    in_order: the prices are already sorted, so the price can be read off by position (bool)
+    returns: price at the percentile (float)
+    '''
+    k = min(len(prices) - 1, int(len(prices) * percentile / 100))
+    if in_order:
+        return prices[k]
+    return quickselect(prices, k)
+
+
+def price_statistics(card_data, percentiles=(25, 75, 90)):
+    '''
+    computes the price statistics of a list of cards in one pass over it: cards are grouped by price while the
+    minimum, maximum and total are tracked, then the median (and any percentiles) are selected from the prices.
+    if the cards are already in price order (as read_card_data, read_decklist and search_cards give them) the
+    median is read off by position, otherwise it is found with quickselect.
+    card_data: cards to compute statistics for (list of tuples)
+    percentiles: extra percentiles to compute, 0 to 100 (iterable of float)
+    returns: statistics keyed by 'count', 'total', 'mean price', 'min price', 'min cards', 'max price',
+             'max cards', 'median price', 'median cards' and 'percentiles' (percentile: price) (dict)
+    '''
+    prices = []
+    cards_by_price = {}
+    total = 0
+    in_order = True
+    min_price = max_price = None
+    for card in card_data:
+        price = card[6]
+        if prices and price < prices[-1]:
+            in_order = False
+        prices.append(price)
+        cards_by_price.setdefault(price, []).append(card)
+        total += price
+        if min_price is None or price < min_price:
+            min_price = price
+        if max_price is None or price > max_price:
+            max_price = price
+
+    if not prices:
+        return {'count': 0, 'total': 0, 'mean price': 0, 'min price': 0, 'min cards': [], 'max price': 0,
+                'max cards': [], 'median price': 0, 'median cards': [], 'percentiles': {}}
+    median_price = price_at_percentile(prices, 50, in_order)
+    return {'count': len(prices),
+            'total': total,
+            'mean price': total / len(prices),
+            'min price': min_price,
+            'min cards': cards_by_price[min_price],
+            'max price': max_price,
+            'max cards': cards_by_price[max_price],
+            'median price': median_price,
+            'median cards': cards_by_price[median_price],
+            'percentiles': {percentile: price_at_percentile(prices, percentile, in_order)
+                            for percentile in percentiles}}
+
+
 def compute_stats(card_data):  # passed test
     '''
-    computes the maximum, minimum, and median price by creating a new list of all prices.
-    then, compares each card's price with each value, and adds them to a new list if their price is the min, max, or med
+    computes the maximum, minimum, and median price and the cards that have them, using price_statistics.
+    the median is the middle price in price order, whatever order card_data is in.
     card_data: all cards in file (list of tuples)
     returns: cards with min price (list), min price (int), cards with max price (list), max price (int), cards with
     median price (list), median price (int)
     '''
-    price_list = []
+    stats = price_statistics(card_data, percentiles=())
+    return stats['min cards'], stats['min price'], stats['max cards'], stats['max price'], \
+        stats['median cards'], stats['median price']
 
-    # max and min price
-    for card in card_data:
-        for index, element in enumerate(card):
-            if index == 6:
-                price_list.append(element)
-    min_price = min(price_list)
-    max_price = max(price_list)
-
-    # median price
-    price_list_length = len(price_list)
-    median_price = price_list[math.floor(price_list_length / 2)]
-
-    # cards
-    min_cards = []
-    max_cards = []
-    median_cards = []
-    for card in card_data:
-        for index, element in enumerate(card):
-            if index == 6:
-                if element == min_price:
-                    min_cards.append(card)
-                if element == max_price:
-                    max_cards.append(card)
-                if element == median_price:
-                    median_cards.append(card)
 
-    return min_cards, min_price, max_cards, max_price, median_cards, median_price
+def stream_card_summary(fp, limit=DISPLAY_LIMIT):
+    '''
+    computes what option 1 shows without keeping every card in memory: the csv file is read one row at a time,
+    the cheapest cards are kept in a heap of at most limit cards, and only the prices (8 bytes each) and the
+    min/max price cards are kept for the stats. the median is selected in place in the price array, so no copy
+    of it is made. if the file can be rewound, a second pass collects the median price cards; otherwise the
+    median cards are left empty.
+    fp: file pointer to csv file
+    limit: number of cheapest cards to keep (int)
+    returns: summary keyed by 'count', 'total', 'cheapest', 'min price', 'min cards', 'max price', 'max cards',
+             'median price' and 'median cards', with every list of cards in price, name order (dict)
+    '''
+    prices = array('d')
+    extremes = {'min price': None, 'min cards': [], 'max price': None, 'max cards': []}
+
+    def tracked_cards():
+        for card in iter_card_data(fp):
+            price = card[6]
+            prices.append(price)
+            for end, better in (('min', price.__lt__), ('max', price.__gt__)):
+                if extremes[end + ' price'] is None or better(extremes[end + ' price']):
+                    extremes[end + ' price'] = price
+                    extremes[end + ' cards'] = []
+                if price == extremes[end + ' price']:
+                    extremes[end + ' cards'].append(card)
+            yield card
+
+    start = fp.tell() if fp.seekable() else None
+    cheapest = nsmallest(limit, tracked_cards(), key=itemgetter(6, 1))  # sort first by price, then name
+    summary = {'count': len(prices), 'total': math.fsum(prices), 'cheapest': cheapest,
+               'median price': 0, 'median cards': []}
+    summary.update(extremes)
+    summary['min cards'].sort(key=itemgetter(6, 1))  # same order as option 1 lists them
+    summary['max cards'].sort(key=itemgetter(6, 1))
+    if prices:
+        summary['median price'] = price_at_percentile(prices, 50)
+        if start is not None:
+            fp.seek(start)
+            summary['median cards'] = sorted((card for card in iter_card_data(fp)
+                                              if card[6] == summary['median price']), key=itemgetter(6, 1))
+    return summary
+
+
+def external_sort_card_data(fp, out_path, chunk_size=SORT_CHUNK_SIZE):
+    '''
+    writes every card to a csv file sorted by price, then name (the read_card_data order) without holding more
+    than chunk_size cards in memory: each chunk is sorted and written to a temporary file, then the sorted
+    chunks are merged.
+    fp: file pointer to csv file
+    out_path: csv file to write the sorted cards to, with the first seven columns (str)
+    chunk_size: cards sorted in memory at a time (int)
+    returns: number of cards written (int)
+    '''
+    sort_key = itemgetter(6, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        chunk_paths = []
+        cards = iter_card_data(fp)
+        while True:
+            chunk = list(islice(cards, chunk_size))
+            if not chunk:
+                break
+            chunk.sort(key=sort_key)
+            chunk_paths.append(os.path.join(directory, "chunk{}.csv".format(len(chunk_paths))))
+            with open(chunk_paths[-1], "w", encoding="utf-8", newline="") as chunk_fp:
+                csv.writer(chunk_fp).writerows(chunk)
+
+        chunk_fps = [open(path, "r", encoding="utf-8", newline="") for path in chunk_paths]
+        try:
+            readers = [(row[:6] + [float(row[6])] for row in csv.reader(chunk_fp)) for chunk_fp in chunk_fps]
+            written = 0
+            with open(out_path, "w", encoding="utf-8", newline="") as out_fp:
+                writer = csv.writer(out_fp)
+                writer.writerow(CATEGORIES[:6] + [PRICE_COLUMNS[0]])
+                for card in merge(*readers, key=sort_key):
+                    writer.writerow(card)
+                    written += 1
+        finally:
+            for chunk_fp in chunk_fps:
+                chunk_fp.close()
+    return written
 
 
 def display_data(card_data):
@@ -186,12 +717,41 @@ def display_stats(min_cards, min_price, max_cards, max_price, med_cards, med_pri
         print("\t{:s}".format(card[1]))
 
 
+def stream_main(args):
+    '''
+    command line entry point for streaming mode, for card files too large to load:
+        python yugioh.py CARDS_FILE [SORTED_OUTPUT_FILE]
+    shows option 1's cheapest cards and stats, and writes all cards sorted by price to SORTED_OUTPUT_FILE if given
+    args: command line arguments after the script name (list of str)
+    returns: nothing
+    '''
+    if len(args) not in (1, 2):
+        print("usage: python yugioh.py CARDS_FILE [SORTED_OUTPUT_FILE]", file=sys.stderr)
+        sys.exit(2)
+    with open(args[0], "r", encoding="utf-8") as fp:
+        summary = stream_card_summary(fp)
+    print("\nThere are {:d} cards in the dataset.".format(summary['count']))
+    display_data(summary['cheapest'])
+    if summary['count']:
+        display_stats(summary['min cards'], summary['min price'], summary['max cards'], summary['max price'],
+                      summary['median cards'], summary['median price'])
+    if len(args) == 2:
+        with open(args[0], "r", encoding="utf-8") as fp:
+            written = external_sort_card_data(fp, args[1])
+        print("\nWrote {:d} cards sorted by price to {:s}".format(written, args[1]))
+
+
 def main():
 
     prompt_str = input("\nEnter cards file name: ")
     fp = open_file(prompt_str)
-    card_data = read_card_data(fp)
+    cache_path = fp.name + CACHE_SUFFIX if os.environ.get(CACHE_ENV) else None
+    card_table = read_card_table(fp, cache_path)
     fp.close()
+    card_data = card_table.card_data
+    card_index = make_card_index(card_data)
+    search_index = make_search_index(card_data)
+    search_cache = SearchCache(card_table, search_index)
 
     option_input = 0
     while option_input != 4:
@@ -216,7 +776,7 @@ def main():
             number_of_cards = len(card_data)
             print("\nThere are {:d} cards in the dataset.".format(number_of_cards))
             display_data(card_data)
-            min_card, min_price, max_card, max_price, med_card, med_price = compute_stats(card_data)
+            min_card, min_price, max_card, max_price, med_card, med_price = card_table.compute_stats()
             display_stats(min_card, min_price, max_card, max_price, med_card, med_price)
 
         # OPTION TWO
@@ -237,14 +797,14 @@ def main():
                     print("\nIncorrect category was selected!")
                     continue
 
-            found_cards = search_cards(card_data, query, category_index)
+            found_cards, stats = search_cache.search(query, category_index)
             empty_list = []
             print("\nSearch results")
             if found_cards != empty_list:
                 print("\nThere are {:d} cards with '{:s}' in the '{:s}' category."
                       .format(len(found_cards), query, category))
                 display_data(found_cards)
-                min_card, min_price, max_card, max_price, med_card, med_price = compute_stats(found_cards)
+                min_card, min_price, max_card, max_price, med_card, med_price = stats
                 display_stats(min_card, min_price, max_card, max_price, med_card, med_price)
             else:
                 print("\nThere are no cards with '{:s}' in the '{:s}' category.".format(query, category))
@@ -253,7 +813,7 @@ def main():
 
             decklist_input = input("\nEnter decklist filename: ")
             decklist_fp = open_file(decklist_input)
-            cards_in_decklist = read_decklist(decklist_fp, card_data)
+            cards_in_decklist = read_decklist(decklist_fp, card_data, card_index)
 
             print("\nSearch results")
             display_data(cards_in_decklist)
@@ -264,5 +824,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        stream_main(sys.argv[1:])
+    else:
+        main()
 